@@ -0,0 +1,120 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncGenerator
+
+from fastapi import HTTPException
+
+
+def _env_number(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+
+class ConcurrencyLimiter:
+    """
+    Route dependency that admits at most `max_concurrent` requests at a time.
+
+    Up to `max_waiting` more wait for at most `timeout` seconds; everything beyond that is
+    rejected straight away with a 503, instead of queueing on the SQLite write lock until
+    every client times out. Waiting happens on the event loop, so queued requests don't hold
+    threadpool workers that reads and admitted writes need.
+    """
+
+    def __init__(self, max_concurrent: int, max_waiting: int, timeout: float, retry_after: int = 1) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.waiting = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._slots: asyncio.Semaphore | None = None
+
+    async def __call__(self) -> AsyncGenerator[None]:
+        slots = self._semaphore()
+        if slots.locked():
+            await self._wait_for_slot(slots)
+        else:
+            await slots.acquire()
+        try:
+            yield
+        finally:
+            slots.release()
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # One per event loop: the server runs a single loop, but test clients may start one per request
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._slots = loop, asyncio.Semaphore(self.max_concurrent)
+        return self._slots
+
+    async def _wait_for_slot(self, slots: asyncio.Semaphore) -> None:
+        if self.waiting >= self.max_waiting:
+            raise self._overloaded()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), self.timeout)
+        except TimeoutError:
+            raise self._overloaded() from None
+        finally:
+            self.waiting -= 1
+
+    def _overloaded(self) -> HTTPException:
+        return HTTPException(status_code=503, detail="Server busy", headers={"Retry-After": str(self.retry_after)})
+
+
+class TokenBucketLimiter:
+    """
+    Per-key token buckets refilled at `rate` tokens per second up to `burst`.
+
+    Only the `max_keys` most recently seen keys are tracked; a key that was evicted
+    starts again with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 10000) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, now: float | None = None) -> float:
+        """Take a token for `key`. Returns 0 if one was available, otherwise the seconds until there is one."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def check(self, key: str) -> None:
+        wait = self.acquire(key)
+        if wait:
+            raise HTTPException(
+                status_code=429, detail="Too many requests", headers={"Retry-After": str(math.ceil(wait))}
+            )
+
+
+message_writes = ConcurrencyLimiter(
+    max_concurrent=int(_env_number("FEEDBACK_MESSAGE_WRITE_CONCURRENCY", 4)),
+    max_waiting=int(_env_number("FEEDBACK_MESSAGE_WRITE_QUEUE", 32)),
+    timeout=_env_number("FEEDBACK_MESSAGE_WRITE_TIMEOUT", 2.0),
+)
+inbox_writes = ConcurrencyLimiter(
+    max_concurrent=int(_env_number("FEEDBACK_INBOX_WRITE_CONCURRENCY", 2)),
+    max_waiting=int(_env_number("FEEDBACK_INBOX_WRITE_QUEUE", 16)),
+    timeout=_env_number("FEEDBACK_INBOX_WRITE_TIMEOUT", 2.0),
+)
+write_rate = TokenBucketLimiter(
+    rate=_env_number("FEEDBACK_WRITE_RATE", 1.0),
+    burst=int(_env_number("FEEDBACK_WRITE_BURST", 10)),
+)
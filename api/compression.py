@@ -0,0 +1,132 @@
+import gzip
+import hashlib
+import os
+from collections import OrderedDict
+
+import brotli
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+MINIMUM_SIZE = int(os.environ.get("FEEDBACK_COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.environ.get("FEEDBACK_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("FEEDBACK_BROTLI_QUALITY", "5"))
+# Bodies larger than this are compressed in the threadpool so they don't stall the event loop
+THREADPOOL_SIZE = 64 * 1024
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """Pick "br" or "gzip" from an Accept-Encoding header, preferring br on equal weights."""
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip()] = weight
+
+    best = max(["br", "gzip"], key=lambda name: weights.get(name, weights.get("*", 0.0)))
+    return best if weights.get(best, weights.get("*", 0.0)) > 0 else None
+
+
+class CompressionMiddleware:
+    """
+    Compress complete responses with Brotli or gzip, as negotiated on Accept-Encoding.
+
+    GET responses to requests without credentials are the same for every caller, so their
+    compressed bodies are kept in an LRU keyed by encoding and a digest of the raw body;
+    repeated public reads cost a hash instead of a compression.
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            minimum_size: int = MINIMUM_SIZE,
+            gzip_level: int = GZIP_LEVEL,
+            brotli_quality: int = BROTLI_QUALITY,
+            cache_size: int = 256,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_size = cache_size
+        self.cache: OrderedDict[tuple[str, bytes], bytes] = OrderedDict()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = negotiate_encoding(request_headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        has_credentials = "x-username" in request_headers or "x-secret" in request_headers
+        public = scope["method"] == "GET" and not has_credentials
+
+        start_message: Message | None = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            # Streamed responses go out untouched, only complete bodies are compressed
+            if message.get("more_body", False) or not self._should_compress(start, body):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = await self._compress(body, encoding, cached=public)
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _should_compress(self, start: Message, body: bytes) -> bool:
+        if len(body) < self.minimum_size or start["status"] in (204, 304):
+            return False
+        headers = Headers(raw=start["headers"])
+        content_type = headers.get("content-type", "")
+        return "content-encoding" not in headers and content_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def _compress(self, body: bytes, encoding: str, cached: bool) -> bytes:
+        cached = cached and self.cache_size > 0
+        if cached:
+            key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+
+        if len(body) > THREADPOOL_SIZE:
+            compressed = await run_in_threadpool(self.compress, body, encoding)
+        else:
+            compressed = self.compress(body, encoding)
+
+        if cached:
+            self.cache[key] = compressed
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return compressed
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
@@ -1,26 +1,31 @@
 from typing import Generator
 
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request, Response
 from sqlalchemy.orm import Session
 
-from repository.database import SessionLocal
-from repository.inbox import SQLAlchemyInboxRepository
-from api import schemas
+from repository.database import ShardSessions
+from repository.inbox import InboxRepository, SQLAlchemyInboxRepository
+from repository.sharding import ShardedInboxRepository
+from api import admission, schemas
+from domain.models import User
 from service.feedback_service import FeedbackService, InboxNotFoundException, InboxNotEditableException, \
-    CannotAddMessageException
+    CannotAddMessageException, CredentialsRequiredException
 
 router = APIRouter()
 
-def get_db() -> Generator[Session]:
-    db = SessionLocal()
+def get_shard_dbs() -> Generator[list[Session]]:
+    dbs = [session_local() for session_local in ShardSessions]
     try:
-        yield db
+        yield dbs
     finally:
-        db.close()
+        for db in dbs:
+            db.close()
 
 
-def get_inbox_repository(db: Session = Depends(get_db)) -> SQLAlchemyInboxRepository:
-    return SQLAlchemyInboxRepository(db)
+def get_inbox_repository(dbs: list[Session] = Depends(get_shard_dbs)) -> InboxRepository:
+    if len(dbs) == 1:
+        return SQLAlchemyInboxRepository(dbs[0])
+    return ShardedInboxRepository.from_sessions(dbs)
 
 
 def get_inbox_credentials(
@@ -30,16 +35,52 @@ def get_inbox_credentials(
     return schemas.InboxAccess(username=x_username, secret=x_secret)
 
 
-def get_feedback_service(repository: SQLAlchemyInboxRepository = Depends(get_inbox_repository)) -> FeedbackService:
+def get_feedback_service(repository: InboxRepository = Depends(get_inbox_repository)) -> FeedbackService:
     return FeedbackService(repository)
 
 
-@router.get("/inboxes/{inbox_id}")
+def _rate_limited_writer(username: str | None, secret: str | None, request: Request,
+                         feedback_service: FeedbackService) -> User:
+    """Rate limit by tripcode, or by client address for anonymous users."""
+    user = feedback_service.get_user_from_username_and_secret(username, secret)
+    key = user.signature or (request.client.host if request.client else "unknown")
+    admission.write_rate.check(key)
+    return user
+
+
+# Listed before the concurrency limiter in each write route's dependencies, so a client over
+# its rate gets a 429 without taking a write slot or a place in the queue. The handler asks
+# for the same dependency to get the user; FastAPI runs it once per request.
+def get_inbox_creator(
+        data: schemas.InboxCreate,
+        request: Request,
+        feedback_service: FeedbackService = Depends(get_feedback_service)
+) -> User:
+    return _rate_limited_writer(data.username, data.secret, request, feedback_service)
+
+
+def get_inbox_editor(
+        data: schemas.InboxUpdate,
+        request: Request,
+        feedback_service: FeedbackService = Depends(get_feedback_service)
+) -> User:
+    return _rate_limited_writer(data.username, data.secret, request, feedback_service)
+
+
+def get_message_author(
+        data: schemas.MessageCreate,
+        request: Request,
+        feedback_service: FeedbackService = Depends(get_feedback_service)
+) -> User:
+    return _rate_limited_writer(data.username, data.secret, request, feedback_service)
+
+
+@router.get("/inboxes/{inbox_id}", response_model=schemas.InboxOwnerRead | schemas.InboxPublicRead)
 def read_inbox(
         inbox_id: str,
         auth: schemas.InboxAccess | None = Depends(get_inbox_credentials), # todo check if this works
         feedback_service: FeedbackService = Depends(get_feedback_service)
-) -> schemas.InboxOwnerRead | schemas.InboxPublicRead:
+) -> Response:
     user = feedback_service.get_user_from_username_and_secret(auth.username, auth.secret)
     try:
         view = feedback_service.read_inbox(inbox_id, user)
@@ -47,46 +88,66 @@ def read_inbox(
         raise HTTPException(status_code=404, detail="Inbox not found")
 
     if view.messages is not None:
-        return schemas.InboxOwnerRead.from_domain(view)
-    return schemas.InboxPublicRead.from_domain(view)
+        return schemas.json_response(schemas.InboxOwnerRead.dict_from_domain(view))
+    return schemas.json_response(schemas.InboxPublicRead.dict_from_domain(view))
 
 
-@router.get("/inboxes")
+@router.get("/inboxes", response_model=list[schemas.InboxOwnerRead] | list[schemas.InboxPublicRead])
 def list_inboxes(
         auth: schemas.InboxAccess | None = Depends(get_inbox_credentials),
         feedback_service: FeedbackService = Depends(get_feedback_service)
-) -> list[schemas.InboxOwnerRead] | list[schemas.InboxPublicRead]:
+) -> Response:
     user = feedback_service.get_user_from_username_and_secret(auth.username, auth.secret)
     views = feedback_service.list_inboxes(user)
     if user.is_anonymous():
         schema = schemas.InboxPublicRead
     else:
         schema = schemas.InboxOwnerRead
-    return [schema.from_domain(view) for view in views]
+    return schemas.json_response([schema.dict_from_domain(view) for view in views])
+
+
+@router.get("/dashboard", response_model=list[schemas.InboxDashboardRead])
+def read_dashboard(
+        latest: int = Query(5, ge=0, le=100),
+        auth: schemas.InboxAccess | None = Depends(get_inbox_credentials),
+        feedback_service: FeedbackService = Depends(get_feedback_service)
+) -> Response:
+    user = feedback_service.get_user_from_username_and_secret(auth.username, auth.secret)
+    try:
+        summaries = feedback_service.dashboard(user, latest)
+    except CredentialsRequiredException:
+        raise HTTPException(status_code=401, detail="Credentials required")
+
+    return schemas.json_response([schemas.InboxDashboardRead.dict_from_domain(summary) for summary in summaries])
 
 
-@router.post("/inboxes")
+@router.post("/inboxes", dependencies=[Depends(get_inbox_creator), Depends(admission.inbox_writes)])
 def create_inbox(
         data: schemas.InboxCreate,
+        user: User = Depends(get_inbox_creator),
         feedback_service: FeedbackService = Depends(get_feedback_service)
 ) -> schemas.InboxOwnerRead:
-    user = feedback_service.get_user_from_username_and_secret(data.username, data.secret)
     new_inbox = feedback_service.create_inbox(
         topic=data.topic,
         user=user,
         requires_signature=data.requires_signature,
-        expires_in_hours=data.expires_in_hours
+        expires_in_hours=data.expires_in_hours,
+        max_messages=data.max_messages,
     )
     return schemas.InboxOwnerRead.from_domain(new_inbox)
 
 
-@router.patch("/inboxes/{inbox_id}", response_model=schemas.InboxOwnerRead)
+@router.patch(
+    "/inboxes/{inbox_id}",
+    response_model=schemas.InboxOwnerRead,
+    dependencies=[Depends(get_inbox_editor), Depends(admission.inbox_writes)],
+)
 def update_inbox(
         inbox_id: str,
         data: schemas.InboxUpdate,
+        user: User = Depends(get_inbox_editor),
         feedback_service: FeedbackService = Depends(get_feedback_service)
 ) -> schemas.InboxOwnerRead:
-    user = feedback_service.get_user_from_username_and_secret(data.username, data.secret)
     try:
         view = feedback_service.update_inbox_topic(inbox_id, data.topic, user)
     except InboxNotFoundException:
@@ -97,13 +158,17 @@ def update_inbox(
     return schemas.InboxOwnerRead.from_domain(view)
 
 
-@router.post("/inboxes/{inbox_id}/messages", response_model=schemas.MessageRead)
+@router.post(
+    "/inboxes/{inbox_id}/messages",
+    response_model=schemas.MessageRead,
+    dependencies=[Depends(get_message_author), Depends(admission.message_writes)],
+)
 def create_message(
         inbox_id: str,
         data: schemas.MessageCreate,
+        user: User = Depends(get_message_author),
         feedback_service: FeedbackService = Depends(get_feedback_service)
 ) -> schemas.MessageRead:
-    user = feedback_service.get_user_from_username_and_secret(data.username, data.secret)
     try:
         msg = feedback_service.add_inbox_message(inbox_id, data.body, user)
     except InboxNotFoundException:
@@ -1,7 +1,16 @@
-from pydantic import BaseModel
+from typing import Any
+
+from fastapi import Response
+from pydantic import BaseModel, Field
+from pydantic_core import to_json
 from datetime import datetime
 
-from domain.models import InboxView
+from domain.models import InboxSummary, InboxView
+
+
+def json_response(content: Any) -> Response:
+    """Encode plain data straight to JSON bytes, skipping FastAPI's response model validation."""
+    return Response(content=to_json(content), media_type="application/json")
 
 
 class MessageCreate(BaseModel):
@@ -22,6 +31,7 @@ class InboxCreate(BaseModel):
     secret: str
     expires_in_hours: int = 24
     requires_signature: bool = True
+    max_messages: int | None = Field(default=None, ge=1)
 
 
 class InboxUpdate(BaseModel):
@@ -41,6 +51,7 @@ class InboxPublicRead(BaseModel):
     expires_at: datetime
     requires_signature: bool
     owner_signature: str
+    max_messages: int | None = None
 
     @classmethod
     def from_domain(cls, inbox_view: InboxView) -> InboxPublicRead:
@@ -49,9 +60,22 @@ class InboxPublicRead(BaseModel):
             topic=inbox_view.inbox.topic,
             expires_at=inbox_view.inbox.expires_at,
             requires_signature=inbox_view.inbox.requires_signature,
-            owner_signature=inbox_view.inbox.owner_signature
+            owner_signature=inbox_view.inbox.owner_signature,
+            max_messages=inbox_view.inbox.max_messages,
         )
 
+    @classmethod
+    def dict_from_domain(cls, inbox_view: InboxView) -> dict[str, Any]:
+        """Same shape as from_domain(...).model_dump(), without building the model."""
+        return {
+            "id": inbox_view.inbox.id,
+            "topic": inbox_view.inbox.topic,
+            "expires_at": inbox_view.inbox.expires_at,
+            "requires_signature": inbox_view.inbox.requires_signature,
+            "owner_signature": inbox_view.inbox.owner_signature,
+            "max_messages": inbox_view.inbox.max_messages,
+        }
+
 
 class InboxOwnerRead(InboxPublicRead):
     """Extends InboxPublicRead with replies to inbox."""
@@ -65,9 +89,35 @@ class InboxOwnerRead(InboxPublicRead):
             expires_at=inbox_view.inbox.expires_at,
             requires_signature=inbox_view.inbox.requires_signature,
             owner_signature=inbox_view.inbox.owner_signature,
+            max_messages=inbox_view.inbox.max_messages,
             messages=[
                 MessageRead(
                     body=message.body, timestamp=message.timestamp, signature=message.signature
                 ) for message in inbox_view.messages
             ] if inbox_view.messages is not None else [None]
-        )
\ No newline at end of file
+        )
+
+    @classmethod
+    def dict_from_domain(cls, inbox_view: InboxView) -> dict[str, Any]:
+        data = super().dict_from_domain(inbox_view)
+        data["messages"] = [
+            {"body": message.body, "timestamp": message.timestamp, "signature": message.signature}
+            for message in inbox_view.messages
+        ] if inbox_view.messages is not None else [None]
+        return data
+
+
+class InboxDashboardRead(InboxPublicRead):
+    """Extends InboxPublicRead with the reply count and only the latest replies."""
+    message_count: int
+    messages: list[MessageRead]
+
+    @classmethod
+    def dict_from_domain(cls, summary: InboxSummary) -> dict[str, Any]:
+        data = super().dict_from_domain(InboxView(inbox=summary.inbox, messages=None))
+        data["message_count"] = summary.message_count
+        data["messages"] = [
+            {"body": message.body, "timestamp": message.timestamp, "signature": message.signature}
+            for message in summary.latest_messages
+        ]
+        return data
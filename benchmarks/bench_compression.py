@@ -0,0 +1,48 @@
+"""
+CPU cost versus bytes saved for compressing a large owner list response.
+
+    python -m benchmarks.bench_compression --inboxes 200 --messages 50
+"""
+import argparse
+import hashlib
+import time
+
+from api import schemas
+from api.compression import CompressionMiddleware
+from benchmarks.bench_list_serialization import make_views
+
+
+def cpu_ms(func, rounds: int) -> float:
+    start = time.process_time()
+    for _ in range(rounds):
+        func()
+    return (time.process_time() - start) / rounds * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--inboxes", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    views = make_views(args.inboxes, args.messages)
+    body = schemas.json_response([schemas.InboxOwnerRead.dict_from_domain(view) for view in views]).body
+    settings = [("gzip", level) for level in (1, 6, 9)] + [("br", quality) for quality in (1, 5, 9, 11)]
+
+    print(f"body {len(body) / 1024:.0f} KiB ({args.inboxes} inboxes x {args.messages} messages)")
+    print(f"{'encoding':10}{'level':>6}{'CPU ms':>10}{'KiB':>10}{'saved':>8}{'KiB saved/CPU ms':>18}")
+    for encoding, level in settings:
+        middleware = CompressionMiddleware(app=None, gzip_level=level, brotli_quality=level)
+        compressed = middleware.compress(body, encoding)
+        cost = cpu_ms(lambda: middleware.compress(body, encoding), args.rounds)
+        saved = len(body) - len(compressed)
+        print(f"{encoding:10}{level:>6}{cost:>10.1f}{len(compressed) / 1024:>10.0f}"
+              f"{saved / len(body):>8.1%}{saved / 1024 / cost:>18.0f}")
+
+    lookup = cpu_ms(lambda: hashlib.blake2b(body, digest_size=16).digest(), args.rounds * 20)
+    print(f"cached public response: {lookup:.2f} CPU ms to hash the body")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Database size and lookup speed before and after migrating to 16-byte inbox keys.
+
+    python -m benchmarks.bench_inbox_keys --inboxes 2000 --messages 50
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from repository.database import make_engine
+from repository.migrations import upgrade
+
+LEGACY_SCHEMA = """
+CREATE TABLE inboxes (id VARCHAR NOT NULL, topic VARCHAR, owner_signature VARCHAR,
+    expires_at DATETIME, requires_signature BOOLEAN, PRIMARY KEY (id));
+CREATE INDEX ix_inboxes_id ON inboxes (id);
+CREATE TABLE messages (id INTEGER NOT NULL, inbox_id VARCHAR, body VARCHAR, timestamp DATETIME,
+    signature VARCHAR, PRIMARY KEY (id), FOREIGN KEY(inbox_id) REFERENCES inboxes (id));
+CREATE INDEX ix_messages_id ON messages (id);
+CREATE INDEX ix_messages_inbox_id ON messages (inbox_id);
+"""
+
+
+def populate_legacy(path: str, inboxes: int, messages: int) -> list[str]:
+    """Mirror the string-keyed schema, with the reply lookup index so both layouts are compared fairly."""
+    ids = [str(uuid.uuid4()) for _ in range(inboxes)]
+    now = datetime.now().isoformat(sep=" ")
+    with sqlite3.connect(path) as connection:
+        connection.executescript(LEGACY_SCHEMA)
+        connection.executemany(
+            "INSERT INTO inboxes VALUES (?, 'Topic', 'owner#0123456789', ?, 1)",
+            [(inbox_id, now) for inbox_id in ids],
+        )
+        connection.executemany(
+            "INSERT INTO messages (inbox_id, body, timestamp, signature) VALUES (?, 'Reply', ?, 'user#0123456789')",
+            [(inbox_id, now) for inbox_id in ids for _ in range(messages)],
+        )
+    return ids
+
+
+def time_lookups(path: str, keys: list, rounds: int) -> float:
+    """Microseconds per primary key lookup plus reply scan, the shape of get_by_id."""
+    with sqlite3.connect(path) as connection:
+        start = time.perf_counter()
+        for key in random.choices(keys, k=rounds):
+            connection.execute("SELECT * FROM inboxes WHERE id = ?", (key,)).fetchone()
+            connection.execute("SELECT body FROM messages WHERE inbox_id = ?", (key,)).fetchall()
+        return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--inboxes", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        ids = populate_legacy(path, args.inboxes, args.messages)
+        with sqlite3.connect(path) as connection:
+            connection.execute("VACUUM")
+        before_size, before_us = os.path.getsize(path), time_lookups(path, ids, args.rounds)
+
+        engine = make_engine(f"sqlite:///{path}")
+        upgrade(engine, target=2)
+        with engine.begin() as connection:
+            # Only the reply lookup index of version 3, so both layouts carry the same indexes
+            connection.exec_driver_sql("CREATE INDEX ix_messages_inbox_id ON messages (inbox_id)")
+        engine.dispose()
+        after_size, after_us = os.path.getsize(path), time_lookups(path, [uuid.UUID(i).bytes for i in ids], args.rounds)
+
+    print(f"{args.inboxes} inboxes x {args.messages} messages")
+    print(f"{'':8}{'size (KiB)':>12}{'lookup (us)':>14}")
+    print(f"{'string':8}{before_size / 1024:>12.0f}{before_us:>14.1f}")
+    print(f"{'blob':8}{after_size / 1024:>12.0f}{after_us:>14.1f}")
+    print(f"size saved: {1 - after_size / before_size:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Throughput of encoding list_inboxes responses, model validation path versus direct JSON bytes.
+
+    python -m benchmarks.bench_list_serialization --inboxes 200 --messages 50
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from pydantic import TypeAdapter
+
+from api import schemas
+from domain.models import Inbox, Message, User
+
+OWNER = User("owner", "secret")
+
+
+def make_views(inboxes: int, messages: int):
+    now = datetime.now()
+    views = []
+    for i in range(inboxes):
+        inbox = Inbox.create(f"Topic {i}", OWNER.signature, 24, False, now=now)
+        inbox.messages = [
+            Message(body=f"Reply {j}", timestamp=now + timedelta(seconds=j), signature="user#0123456789")
+            for j in range(messages)
+        ]
+        views.append(inbox.view_for(OWNER))
+    return views
+
+
+def encode_models(views, adapter: TypeAdapter) -> bytes:
+    """What FastAPI did before: build models, validate them against the return type, encode generically."""
+    models = [schemas.InboxOwnerRead.from_domain(view) for view in views]
+    validated = adapter.validate_python(models, from_attributes=True)
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def encode_direct(views, adapter: TypeAdapter) -> bytes:
+    return schemas.json_response([schemas.InboxOwnerRead.dict_from_domain(view) for view in views]).body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--inboxes", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    views = make_views(args.inboxes, args.messages)
+    adapter = TypeAdapter(list[schemas.InboxOwnerRead])
+    assert json.loads(encode_models(views, adapter)) == json.loads(encode_direct(views, adapter))
+
+    print(f"{args.inboxes} inboxes x {args.messages} messages, owner list")
+    results = {}
+    for name, encode in (("models", encode_models), ("direct", encode_direct)):
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            encode(views, adapter)
+        results[name] = args.rounds / (time.perf_counter() - start)
+        print(f"{name:8}{results[name]:>10.1f} responses/s")
+    print(f"speedup: {results['direct'] / results['models']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Peak memory of an owner reading one large inbox, ORM entities versus plain rows.
+
+    python -m benchmarks.bench_owner_read --messages 100000
+
+Every path runs in a fresh interpreter so ru_maxrss belongs to that path alone. Allocated
+blocks are the difference between tracemalloc snapshots taken before and after the read, while
+its response is still held. Times are measured with tracemalloc running and are only comparable
+with each other.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from sqlalchemy import insert
+from fastapi import Response
+from sqlalchemy.orm import sessionmaker
+
+from api.schemas import InboxOwnerRead, json_response
+from domain.models import Inbox, Message, User
+from repository.database import Base, InboxORM, MessageORM, make_engine
+from repository.inbox import SQLAlchemyInboxRepository
+
+OWNER = User("owner", "secret")
+
+
+def populate(url: str, messages: int) -> str:
+    engine = make_engine(url)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    inbox = Inbox.create("Big inbox", OWNER.signature, 24, False)
+    SQLAlchemyInboxRepository(session).save_new(inbox)
+    now = datetime.now()
+    session.execute(insert(MessageORM), [
+        {"inbox_id": inbox.id, "body": f"Reply number {i}", "timestamp": now, "signature": "user#0123456789"}
+        for i in range(messages)
+    ])
+    session.commit()
+    session.close()
+    return inbox.id
+
+
+def read_orm(session, inbox_id: str) -> InboxOwnerRead:
+    """The previous path: InboxORM with lazy-loaded MessageORM replies, then domain, then schema."""
+    orm = session.query(InboxORM).filter_by(id=inbox_id).first()
+    inbox = Inbox(
+        id=orm.id, topic=orm.topic, owner_signature=orm.owner_signature, expires_at=orm.expires_at,
+        requires_signature=orm.requires_signature,
+        messages=[Message(body=m.body, timestamp=m.timestamp, signature=m.signature) for m in orm.replies],
+    )
+    return InboxOwnerRead.from_domain(inbox.view_for(OWNER))
+
+
+def read_rows(session, inbox_id: str) -> Response:
+    """What GET /inboxes/{inbox_id} does now: plain rows to domain objects, then straight to JSON bytes."""
+    inbox = SQLAlchemyInboxRepository(session).get_by_id(inbox_id)
+    return json_response(InboxOwnerRead.dict_from_domain(inbox.view_for(OWNER)))
+
+
+PATHS = {"orm": read_orm, "rows": read_rows}
+
+
+def measure(path: str, url: str, inbox_id: str) -> None:
+    session = sessionmaker(bind=make_engine(url))()
+    read = PATHS[path]
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    result = read(session, inbox_id)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    assert result
+
+    rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{path:6}{elapsed * 1000:>10.0f}{peak / 2**20:>16.1f}{blocks:>18}{rss_kib / 1024:>14.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--measure", nargs=3, metavar=("PATH", "URL", "INBOX_ID"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        inbox_id = populate(url, args.messages)
+        print(f"owner read of {args.messages} messages")
+        print(f"{'path':6}{'time (ms)':>10}{'traced peak MiB':>16}{'blocks allocated':>18}{'peak RSS MiB':>14}")
+        sys.stdout.flush()
+        for path in PATHS:
+            subprocess.run([sys.executable, "-m", "benchmarks.bench_owner_read", "--measure", path, url, inbox_id],
+                           check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Signature resolution throughput with and without the credential cache, under threaded load.
+
+    python -m benchmarks.bench_signature_cache --threads 8 --users 500
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from domain.models import User
+from service.feedback_service import FeedbackService, signature_cache
+
+
+def uncached(username: str, secret: str) -> User:
+    return User(username, secret)
+
+
+def run(resolve, credentials: list[tuple[str, str]], threads: int, calls: int) -> float:
+    """Calls per second across all threads; every thread polls random credentials from the pool."""
+    def worker(seed: int) -> None:
+        picks = random.Random(seed).choices(credentials, k=calls)
+        for username, secret in picks:
+            resolve(username, secret)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(worker, range(threads)))
+    return threads * calls / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--users", type=int, default=500, help="distinct credentials polling")
+    parser.add_argument("--calls", type=int, default=100_000, help="calls per thread")
+    args = parser.parse_args()
+
+    credentials = [(f"owner{i}", f"secret-{i}-{'x' * 20}") for i in range(args.users)]
+    signature_cache.clear()
+    print(f"{args.threads} threads, {args.users} distinct credentials, cache size {signature_cache.maxsize}")
+    baseline = run(uncached, credentials, args.threads, args.calls)
+    print(f"{'uncached':10}{baseline:>12,.0f} calls/s")
+    cached = run(FeedbackService.get_user_from_username_and_secret, credentials, args.threads, args.calls)
+    print(f"{'cached':10}{cached:>12,.0f} calls/s  hit rate {signature_cache.hit_rate:.1%}")
+    print(f"speedup: {cached / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
 import hashlib
+import os
+import threading
 import uuid
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 
@@ -10,7 +13,66 @@ def generate_tripcode_signature(username: str, secret: str, separator: str = "#"
     return f"{username}{separator}{hashed}"
 
 
-@dataclass
+class SignatureCache:
+    """
+    Thread-safe LRU cache of tripcode signatures.
+
+    Entries are keyed by a BLAKE2b MAC of the credentials under a random key made per cache,
+    so the cache never holds a raw secret, and a hit can't hand out another user's tripcode:
+    keys don't collide in practice and can't be computed without the in-memory key.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._signatures: OrderedDict[bytes, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._digest_key = os.urandom(32)
+
+    def _key(self, username: str, secret: str) -> bytes:
+        encoded_username = username.encode()
+        digest = hashlib.blake2b(key=self._digest_key, digest_size=32)
+        # Length-prefixed, so moving characters between username and secret changes the input
+        digest.update(len(encoded_username).to_bytes(8))
+        digest.update(encoded_username)
+        digest.update(secret.encode())
+        return digest.digest()
+
+    def get(self, username: str, secret: str) -> str:
+        key = self._key(username, secret)
+        with self._lock:
+            signature = self._signatures.get(key)
+            if signature is not None:
+                self._signatures.move_to_end(key)
+                self.hits += 1
+                return signature
+            self.misses += 1
+
+        signature = generate_tripcode_signature(username, secret)
+        with self._lock:
+            if self.maxsize > 0:
+                self._signatures[key] = signature
+                if len(self._signatures) > self.maxsize:
+                    self._signatures.popitem(last=False)
+        return signature
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._signatures.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+@dataclass(slots=True)
 class User:
     username: str | None
     secret: str | None
@@ -25,7 +87,7 @@ class User:
         return self.signature is None
 
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     body: str
     timestamp: datetime = field(default_factory=datetime.now)
@@ -36,7 +98,7 @@ class Message:
         return cls(body=body, timestamp=datetime.now(), signature=user.signature)
 
 
-@dataclass
+@dataclass(slots=True)
 class Inbox:
     id: str
     topic: str
@@ -44,6 +106,7 @@ class Inbox:
     requires_signature: bool
     expires_at: datetime
     messages: list[Message] = field(default_factory=list)
+    max_messages: int | None = None
 
     @classmethod
     def create(
@@ -53,7 +116,10 @@ class Inbox:
             expires_in_hours: int,
             requires_signature: bool,
             now: datetime | None = None,
+            max_messages: int | None = None,
     ) -> Inbox:
+        if max_messages is not None and max_messages < 1:
+            raise ValueError("Inbox must keep at least one message")
         id = str(uuid.uuid4())
         now = now or datetime.now()
         expires_at = now + timedelta(hours=expires_in_hours)
@@ -63,6 +129,7 @@ class Inbox:
             owner_signature=owner_signature,
             expires_at=expires_at,
             requires_signature=requires_signature,
+            max_messages=max_messages,
         )
 
     def is_expired(self) -> bool:
@@ -83,6 +150,9 @@ class Inbox:
             raise ValueError("Anonymous reply not allowed")
 
         self.messages.append(message)
+        # Ring buffer: once over the cap, the oldest replies make room for the new one
+        if self.max_messages is not None and len(self.messages) > self.max_messages:
+            del self.messages[:len(self.messages) - self.max_messages]
 
     def edit_topic(self, new_topic: str, user: User) -> None:
         if user.is_anonymous():
@@ -98,7 +168,15 @@ class Inbox:
         return InboxView(inbox=self, messages=messages)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class InboxView:
     inbox: Inbox
     messages: list[Message] | None
+
+
+@dataclass(slots=True, frozen=True)
+class InboxSummary:
+    """An inbox with its reply count and only the latest replies, oldest first."""
+    inbox: Inbox
+    message_count: int
+    latest_messages: list[Message]
@@ -1,7 +1,14 @@
 from fastapi import FastAPI
+from api.compression import CompressionMiddleware
 from api.routes import router as inbox_router
+from repository.database import ShardEngines
+from repository.migrations import upgrade
+
+for shard_engine in ShardEngines:
+    upgrade(shard_engine)
 
 app = FastAPI(title="Feedback app")
+app.add_middleware(CompressionMiddleware)
 app.include_router(inbox_router)
 
 @app.get("/")
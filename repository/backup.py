@@ -0,0 +1,211 @@
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import time
+from contextlib import ExitStack
+from datetime import datetime
+from typing import Callable, Iterator
+
+from sqlalchemy import DateTime, Engine, Table, insert, make_url, select
+
+from repository.database import SHARD_COUNT, InboxORM, MessageORM, make_engine, shard_url
+from repository.migrations import upgrade
+from repository.sharding import shard_index
+
+# Parents first, so an import never inserts a reply before its inbox. The last element names
+# the column holding the inbox id, which picks the shard a row is imported into.
+EXPORT_TABLES: list[tuple[Table, tuple[str, ...], str]] = [
+    (InboxORM.__table__, (), "id"),
+    # Reply ids are local to a database; the importer assigns new ones in file order
+    (MessageORM.__table__, ("id",), "inbox_id"),
+]
+BATCH_SIZE = 5000
+# Restarts caused by concurrent writes before a snapshot stops yielding to writers
+MAX_RESTARTS = 3
+
+
+def _database_path(url: str) -> str:
+    return make_url(url).database
+
+
+def shard_file(path: str, index: int) -> str:
+    """Shard 0 keeps `path` and shard i gets .shard{i} before the extension, as in shard_url."""
+    if index == 0:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.shard{index}{extension}"
+
+
+class _CopyKeepsRestarting(Exception):
+    pass
+
+
+def _copy_database(source: str, target: str, pages: int, pause: float, report: Callable[[int, int], None],
+                   max_restarts: int = MAX_RESTARTS) -> None:
+    """
+    Copy with SQLite's online backup API, `pages` at a time.
+
+    The source is only read-locked while a step runs; the pause between steps lets writers in.
+    If they change the source, SQLite restarts the copy from the first page, so the result is
+    always consistent. Under a steady stream of writes it would never finish, so after
+    `max_restarts` restarts the copy is redone in a single step that holds the read lock
+    throughout; writers wait for that one step instead.
+    """
+    remaining_before = None
+    restarts = 0
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        nonlocal remaining_before, restarts
+        # A step that hit a lock copied nothing without restarting, so only completed steps are compared
+        if status == sqlite3.SQLITE_OK:
+            if remaining_before is not None and remaining >= remaining_before:
+                restarts += 1
+                if restarts > max_restarts:
+                    raise _CopyKeepsRestarting
+            remaining_before = remaining
+        report(total - remaining, total)
+        if pause:
+            time.sleep(pause)
+
+    # Read-only, so a mistyped source path fails instead of creating an empty database
+    source_connection = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+    target_connection = sqlite3.connect(target)
+    try:
+        try:
+            source_connection.backup(target_connection, pages=pages, progress=progress)
+        except _CopyKeepsRestarting:
+            source_connection.backup(target_connection, pages=-1)
+            copied = target_connection.execute("PRAGMA page_count").fetchone()[0]
+            report(copied, copied)
+    finally:
+        target_connection.close()
+        source_connection.close()
+
+
+def snapshot(url: str, target: str, pages: int = 256, pause: float = 0.001,
+             report: Callable[[int, int], None] = lambda done, total: None) -> None:
+    """Write a consistent copy of a live database to the file `target`."""
+    _copy_database(_database_path(url), target, pages, pause, report)
+
+
+def restore(snapshot_path: str, url: str, pages: int = 256,
+            report: Callable[[int, int], None] = lambda done, total: None) -> None:
+    """Replace the contents of the database at `url` with a snapshot."""
+    _copy_database(snapshot_path, _database_path(url), pages, 0, report)
+
+
+def _encode(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def export_ndjson(engines: list[Engine], path: str) -> int:
+    """
+    Stream every inbox and reply of all shards to gzip-compressed NDJSON, one
+    {"table": ..., "row": ...} per line. Every shard's inboxes come before any replies.
+    """
+    rows = 0
+    with gzip.open(path, "wt", encoding="utf-8") as output, ExitStack() as stack:
+        connections = [stack.enter_context(engine.connect()) for engine in engines]
+        for table, exclude, _ in EXPORT_TABLES:
+            columns = [column for column in table.columns if column.key not in exclude]
+            for connection in connections:
+                result = connection.execution_options(yield_per=BATCH_SIZE).execute(
+                    select(*columns).order_by(*table.primary_key.columns)
+                )
+                for row in result:
+                    record = {"table": table.name, "row": {key: _encode(value) for key, value in row._mapping.items()}}
+                    output.write(json.dumps(record, separators=(",", ":")))
+                    output.write("\n")
+                    rows += 1
+    return rows
+
+
+def _read_batches(path: str) -> Iterator[tuple[Table, list[dict]]]:
+    tables = {table.name: table for table, _, _ in EXPORT_TABLES}
+    date_columns = {
+        table.name: [column.key for column in table.columns if isinstance(column.type, DateTime)]
+        for table, _, _ in EXPORT_TABLES
+    }
+
+    table, batch = None, []
+    with gzip.open(path, "rt", encoding="utf-8") as source:
+        for line in source:
+            record = json.loads(line)
+            if table is not None and (record["table"] != table.name or len(batch) >= BATCH_SIZE):
+                yield table, batch
+                batch = []
+            table = tables[record["table"]]
+            row = record["row"]
+            for key in date_columns[table.name]:
+                if row.get(key) is not None:
+                    row[key] = datetime.fromisoformat(row[key])
+            batch.append(row)
+    if batch:
+        yield table, batch
+
+
+def import_ndjson(engines: list[Engine], path: str) -> int:
+    """
+    Bulk insert an export in batches of executemany, in one transaction per shard.
+
+    Every inbox and its replies go to the shard shard_index picks among `engines`, whatever
+    shard they were exported from, so an export can also be loaded into a new shard count.
+    """
+    for engine in engines:
+        upgrade(engine)
+    shard_keys = {table.name: shard_key for table, _, shard_key in EXPORT_TABLES}
+    rows = 0
+    with ExitStack() as stack:
+        connections = [stack.enter_context(engine.begin()) for engine in engines]
+        for table, batch in _read_batches(path):
+            by_shard: list[list[dict]] = [[] for _ in connections]
+            for row in batch:
+                by_shard[shard_index(row[shard_keys[table.name]], len(connections))].append(row)
+            for connection, shard_batch in zip(connections, by_shard):
+                if shard_batch:
+                    connection.execute(insert(table), shard_batch)
+            rows += len(batch)
+    return rows
+
+
+def _report_rate(action: str, rows: int, started: float) -> None:
+    elapsed = time.perf_counter() - started
+    print(f"{action} {rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Snapshot, restore, export and import feedback databases.")
+    parser.add_argument("--url", action="append", dest="urls",
+                        help="database url, once per shard in shard order; defaults to the configured shards")
+    commands = parser.add_subparsers(dest="command", required=True)
+    snapshot_parser = commands.add_parser("snapshot", help="hot copy of every shard, one file per shard")
+    snapshot_parser.add_argument("target")
+    snapshot_parser.add_argument("--pages", type=int, default=256, help="pages copied per step")
+    restore_parser = commands.add_parser("restore", help="overwrite every shard with its snapshot file")
+    restore_parser.add_argument("source")
+    commands.add_parser("export", help="write inboxes and replies as NDJSON.gz").add_argument("target")
+    commands.add_parser("import", help="bulk load an NDJSON.gz export").add_argument("source")
+    args = parser.parse_args(argv)
+
+    urls = args.urls or [shard_url(index) for index in range(SHARD_COUNT)]
+    started = time.perf_counter()
+    if args.command == "snapshot":
+        for index, url in enumerate(urls):
+            snapshot(url, shard_file(args.target, index), pages=args.pages)
+            print(f"Snapshot of {url} written to {shard_file(args.target, index)}")
+        print(f"Snapshot of {len(urls)} shard(s) done in {time.perf_counter() - started:.2f}s")
+    elif args.command == "restore":
+        for index, url in enumerate(urls):
+            restore(shard_file(args.source, index), url)
+            print(f"Restored {url} from {shard_file(args.source, index)}")
+        print(f"Restore of {len(urls)} shard(s) done in {time.perf_counter() - started:.2f}s")
+    elif args.command == "export":
+        _report_rate("Exported", export_ndjson([make_engine(url) for url in urls], args.target), started)
+    else:
+        _report_rate("Imported", import_ndjson([make_engine(url) for url in urls], args.source), started)
+
+
+if __name__ == "__main__":
+    main()
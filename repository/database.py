@@ -1,28 +1,69 @@
-from sqlalchemy import create_engine, Column, String, DateTime, Boolean, Integer, ForeignKey
+import os
+import uuid
+
+from sqlalchemy import create_engine, Column, String, DateTime, Boolean, Integer, ForeignKey, Engine, LargeBinary, \
+    TypeDecorator
 from sqlalchemy.orm import sessionmaker, relationship, declarative_base
 
 DATABASE_URL = "sqlite:///./feedback.db"
+SHARD_COUNT = int(os.environ.get("FEEDBACK_SHARD_COUNT", "1"))
+
+
+def shard_url(index: int) -> str:
+    """Shard 0 is the original database, so a single-shard setup is unchanged."""
+    if index == 0:
+        return DATABASE_URL
+    return f"sqlite:///./feedback.shard{index}.db"
+
+
+def make_engine(url: str) -> Engine:
+    return create_engine(url, connect_args={"check_same_thread": False})
+
+
+def is_inbox_key(value: str) -> bool:
+    """
+    Only the canonical lowercase, dashed form: shards are picked by hashing the id string, so
+    another spelling of the same UUID would be looked up on a shard that doesn't hold it.
+    """
+    try:
+        return str(uuid.UUID(value)) == value
+    except ValueError:
+        return False
+
+
+class InboxKey(TypeDecorator):
+    """Stores the string UUID of an inbox as its 16 raw bytes instead of 36 characters."""
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def process_bind_param(self, value: str | None, dialect) -> bytes | None:
+        return uuid.UUID(value).bytes if value is not None else None
+
+    def process_result_value(self, value: bytes | None, dialect) -> str | None:
+        return str(uuid.UUID(bytes=value)) if value is not None else None
+
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = make_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 class InboxORM(Base):
     __tablename__ = "inboxes"
 
-    id = Column(String, primary_key=True, index=True)
+    id = Column(InboxKey, primary_key=True)
     topic = Column(String)
-    owner_signature = Column(String)
-    expires_at = Column(DateTime)
+    owner_signature = Column(String, index=True)
+    expires_at = Column(DateTime, index=True)
     requires_signature = Column(Boolean)
+    max_messages = Column(Integer, nullable=True)
 
     replies = relationship("MessageORM", back_populates="inbox", cascade="all, delete-orphan")
 
 class MessageORM(Base):
     __tablename__ = "messages"
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    inbox_id = Column(String, ForeignKey("inboxes.id"))
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    inbox_id = Column(InboxKey, ForeignKey("inboxes.id"), index=True)
     body = Column(String)
     timestamp = Column(DateTime)
     signature = Column(String, nullable=True)
@@ -30,4 +71,7 @@ class MessageORM(Base):
     inbox = relationship("InboxORM", back_populates="replies")
 
 
-Base.metadata.create_all(bind=engine)
+ShardEngines: list[Engine] = [engine] + [make_engine(shard_url(i)) for i in range(1, SHARD_COUNT)]
+ShardSessions: list[sessionmaker] = [SessionLocal] + [
+    sessionmaker(autocommit=False, autoflush=False, bind=shard_engine) for shard_engine in ShardEngines[1:]
+]
@@ -1,9 +1,10 @@
 from abc import ABC, abstractmethod
 
-from sqlalchemy.orm import Session
+from sqlalchemy import ColumnElement, LargeBinary, Label, and_, delete, func, select, type_coerce
+from sqlalchemy.orm import Session, aliased
 
-from domain.models import Inbox, Message
-from repository.database import InboxORM, MessageORM
+from domain.models import Inbox, InboxSummary, Message
+from repository.database import InboxORM, MessageORM, is_inbox_key
 
 class InboxRepository(ABC):
     @abstractmethod
@@ -30,6 +31,10 @@ class InboxRepository(ABC):
     def get_by_id(self, id: str) -> Inbox | None:
         pass
 
+    @abstractmethod
+    def summarize_by_signature(self, owner_signature: str, latest: int) -> list[InboxSummary]:
+        pass
+
 
 class SQLAlchemyInboxRepository(InboxRepository):
     def __init__(self, db: Session):
@@ -47,6 +52,7 @@ class SQLAlchemyInboxRepository(InboxRepository):
             owner_signature=inbox.owner_signature,
             expires_at=inbox.expires_at,
             requires_signature=inbox.requires_signature,
+            max_messages=inbox.max_messages,
             replies=[
                 MessageORM(
                     body=m.body,
@@ -69,44 +75,130 @@ class SQLAlchemyInboxRepository(InboxRepository):
         self.db.commit()
 
     def add_message(self, inbox: Inbox, message: Message):
-        inbox_orm = self.db.query(InboxORM).filter_by(id=inbox.id).first()
-        if not inbox_orm:
+        # Insert on its own instead of appending to inbox_orm.replies, which would load every reply
+        exists = self.db.query(InboxORM.id).filter_by(id=inbox.id).first()
+        if not exists:
             raise ValueError(f"Inbox with id {inbox.id} does not exist")
-        inbox_orm.replies.append(MessageORM(
-            body=message.body, timestamp=message.timestamp, signature=message.signature
+        self.db.add(MessageORM(
+            inbox_id=inbox.id, body=message.body, timestamp=message.timestamp, signature=message.signature
         ))
+        if inbox.max_messages is not None:
+            self.db.flush()
+            self._drop_oldest_messages(inbox.id, inbox.max_messages)
         self.db.commit()
 
     def list_all(self) -> list[Inbox]:
-        orms: list[InboxORM] = self.db.query(InboxORM).all() # todo move to select for good typehints
-        return [self._inbox_to_domain(inbox_orm) for inbox_orm in orms]
+        return self._load_inboxes()
 
     def list_by_signature(self, owner_signature: str) -> list[Inbox]:
-        return [
-            self._inbox_to_domain(inbox_orm)
-            for inbox_orm in self.db.query(InboxORM).filter_by(owner_signature=owner_signature).all()
-        ]
+        return self._load_inboxes(InboxORM.owner_signature == owner_signature)
 
     def get_by_id(self, inbox_id: str) -> Inbox | None:
-        inbox_orm: InboxORM | None = self.db.query(InboxORM).filter_by(id=inbox_id).first()
-        if not inbox_orm:
+        if not is_inbox_key(inbox_id):
             return None
+        inboxes = self._load_inboxes(InboxORM.id == inbox_id)
+        return inboxes[0] if inboxes else None
+
+    def summarize_by_signature(self, owner_signature: str, latest: int) -> list[InboxSummary]:
+        """
+        Every inbox of the owner with its reply count and latest `latest` replies, in one query.
+
+        Both the count and the newest reply ids are correlated lookups on ix_messages_inbox_id,
+        which only touch (inbox_id, id) pairs, so bodies are read for at most `latest` replies
+        per inbox and the whole reply set is never materialized or sorted.
+        """
+        counted, ranked = aliased(MessageORM), aliased(MessageORM)
+        message_count = (
+            select(func.count())
+            .select_from(counted)
+            .where(counted.inbox_id == InboxORM.id)
+            .scalar_subquery()
+        )
+        newest = (
+            select(ranked.id)
+            .where(ranked.inbox_id == InboxORM.id)
+            .order_by(ranked.id.desc())
+            .limit(latest)
+        )
+        rows = self.db.execute(
+            select(
+                InboxORM.id, InboxORM.topic, InboxORM.owner_signature, InboxORM.expires_at,
+                InboxORM.requires_signature, InboxORM.max_messages, _raw_key(InboxORM.id),
+                message_count.label("message_count"),
+                MessageORM.id.label("message_id"), MessageORM.body, MessageORM.timestamp, MessageORM.signature,
+            )
+            .outerjoin(MessageORM, and_(MessageORM.inbox_id == InboxORM.id, MessageORM.id.in_(newest)))
+            .where(InboxORM.owner_signature == owner_signature)
+            .order_by(InboxORM.id, MessageORM.id)
+        )
 
-        return self._inbox_to_domain(inbox_orm)
-
-    def _inbox_to_domain(self, orm: InboxORM) -> Inbox:
-        return Inbox(
-            id=orm.id,
-            topic=orm.topic,
-            owner_signature=orm.owner_signature,
-            expires_at=orm.expires_at,
-            requires_signature=orm.requires_signature,
-            messages=[self._msg_to_domain(m) for m in orm.replies],
+        summaries: list[InboxSummary] = []
+        current_key = None
+        for row in rows:
+            if row.key != current_key:
+                current_key = row.key
+                inbox = Inbox(
+                    id=row.id,
+                    topic=row.topic,
+                    owner_signature=row.owner_signature,
+                    expires_at=row.expires_at,
+                    requires_signature=row.requires_signature,
+                    max_messages=row.max_messages,
+                )
+                summaries.append(InboxSummary(inbox=inbox, message_count=row.message_count, latest_messages=[]))
+            if row.message_id is not None:
+                summaries[-1].latest_messages.append(Message(row.body, row.timestamp, row.signature))
+        return summaries
+
+    def _drop_oldest_messages(self, inbox_id: str, keep: int) -> None:
+        """Delete all but the newest `keep` replies, in the transaction of the insert that overflowed."""
+        newest = (
+            select(MessageORM.id)
+            .where(MessageORM.inbox_id == inbox_id)
+            .order_by(MessageORM.id.desc())
+            .limit(keep)
+        )
+        self.db.execute(delete(MessageORM).where(MessageORM.inbox_id == inbox_id, MessageORM.id.not_in(newest)))
+
+    def _load_inboxes(self, *criteria: ColumnElement[bool]) -> list[Inbox]:
+        """
+        Map plain rows straight to domain objects, skipping InboxORM/MessageORM entities.
+
+        Replies of all matching inboxes come from a single query and are grouped by the raw
+        16-byte key, so the key is decoded once per inbox rather than once per message.
+        """
+        inbox_rows = self.db.execute(
+            select(
+                InboxORM.id, InboxORM.topic, InboxORM.owner_signature, InboxORM.expires_at,
+                InboxORM.requires_signature, InboxORM.max_messages, _raw_key(InboxORM.id),
+            ).where(*criteria)
+        ).all()
+        if not inbox_rows:
+            return []
+
+        messages: dict[bytes, list[Message]] = {row.key: [] for row in inbox_rows}
+        message_rows = self.db.execute(
+            select(_raw_key(MessageORM.inbox_id), MessageORM.body, MessageORM.timestamp, MessageORM.signature)
+            .join(InboxORM, MessageORM.inbox_id == InboxORM.id)
+            .where(*criteria)
+            .order_by(MessageORM.id)
         )
+        for key, body, timestamp, signature in message_rows:
+            messages[key].append(Message(body, timestamp, signature))
+
+        return [
+            Inbox(
+                id=row.id,
+                topic=row.topic,
+                owner_signature=row.owner_signature,
+                expires_at=row.expires_at,
+                requires_signature=row.requires_signature,
+                messages=messages[row.key],
+                max_messages=row.max_messages,
+            )
+            for row in inbox_rows
+        ]
+
 
-    def _msg_to_domain(self, orm_msg: MessageORM) -> Message:
-        return Message(
-            body=orm_msg.body,
-            timestamp=orm_msg.timestamp,
-            signature=orm_msg.signature,
-        )
\ No newline at end of file
+def _raw_key(column: ColumnElement) -> Label:
+    return type_coerce(column, LargeBinary).label("key")
\ No newline at end of file
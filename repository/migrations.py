@@ -0,0 +1,161 @@
+import argparse
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Generator
+
+from sqlalchemy import Connection, Engine, inspect, text
+
+from repository.database import ShardEngines, make_engine
+
+
+@dataclass(slots=True, frozen=True)
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+    vacuum: bool = False
+
+
+def _execute_all(connection: Connection, statements: list[str]) -> None:
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def create_baseline_schema(connection: Connection) -> None:
+    """
+    The schema as first created by Base.metadata.create_all, so every database starts from the same place.
+
+    Skipped when the tables exist: a database made by a later create_all has blob ids and no
+    primary key indexes, and step 2 leaves blob ids alone, so it would never drop them again.
+    """
+    if inspect(connection).has_table("inboxes"):
+        return
+    _execute_all(connection, [
+        "CREATE TABLE IF NOT EXISTS inboxes (id VARCHAR NOT NULL, topic VARCHAR, owner_signature VARCHAR, "
+        "expires_at DATETIME, requires_signature BOOLEAN, PRIMARY KEY (id))",
+        "CREATE INDEX IF NOT EXISTS ix_inboxes_id ON inboxes (id)",
+        "CREATE TABLE IF NOT EXISTS messages (id INTEGER NOT NULL, inbox_id VARCHAR, body VARCHAR, "
+        "timestamp DATETIME, signature VARCHAR, PRIMARY KEY (id), FOREIGN KEY(inbox_id) REFERENCES inboxes (id))",
+        "CREATE INDEX IF NOT EXISTS ix_messages_id ON messages (id)",
+    ])
+
+
+def inbox_ids_are_blobs(connection: Connection) -> bool:
+    columns = {column["name"]: column for column in inspect(connection).get_columns("inboxes")}
+    return str(columns["id"]["type"]).upper() == "BLOB"
+
+
+def convert_inbox_ids_to_blobs(connection: Connection) -> None:
+    """
+    Rebuild the tables so inbox ids are stored as 16-byte keys instead of 36-character strings.
+
+    SQLite can't change a column type in place, so the tables are recreated and copied over.
+    The redundant indexes on the primary keys are not recreated.
+    """
+    if inbox_ids_are_blobs(connection):
+        return
+
+    connection.connection.driver_connection.create_function(
+        "uuid_blob", 1, lambda value: uuid.UUID(value).bytes if value is not None else None, deterministic=True
+    )
+    _execute_all(connection, [
+        "CREATE TABLE inboxes_new (id BLOB NOT NULL, topic VARCHAR, owner_signature VARCHAR, "
+        "expires_at DATETIME, requires_signature BOOLEAN, PRIMARY KEY (id))",
+        "CREATE TABLE messages_new (id INTEGER NOT NULL, inbox_id BLOB, body VARCHAR, timestamp DATETIME, "
+        "signature VARCHAR, PRIMARY KEY (id), FOREIGN KEY(inbox_id) REFERENCES inboxes (id))",
+        "INSERT INTO inboxes_new SELECT uuid_blob(id), topic, owner_signature, expires_at, requires_signature "
+        "FROM inboxes",
+        "INSERT INTO messages_new SELECT id, uuid_blob(inbox_id), body, timestamp, signature FROM messages",
+        "DROP TABLE messages",
+        "DROP TABLE inboxes",
+        "ALTER TABLE inboxes_new RENAME TO inboxes",
+        "ALTER TABLE messages_new RENAME TO messages",
+    ])
+
+
+def create_query_indexes(connection: Connection) -> None:
+    """Indexes for list_by_signature, expiry lookups and loading the replies of an inbox."""
+    _execute_all(connection, [
+        "CREATE INDEX IF NOT EXISTS ix_inboxes_owner_signature ON inboxes (owner_signature)",
+        "CREATE INDEX IF NOT EXISTS ix_inboxes_expires_at ON inboxes (expires_at)",
+        "CREATE INDEX IF NOT EXISTS ix_messages_inbox_id ON messages (inbox_id)",
+    ])
+
+
+def add_inbox_message_cap(connection: Connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("inboxes")}
+    if "max_messages" not in columns:
+        connection.execute(text("ALTER TABLE inboxes ADD COLUMN max_messages INTEGER"))
+
+
+# Append only. Databases from before versioning are at version 0 whatever their shape,
+# so every step has to be a no-op on a schema that already has its change.
+MIGRATIONS = [
+    Migration(1, "baseline schema", create_baseline_schema),
+    Migration(2, "16-byte inbox keys", convert_inbox_ids_to_blobs, vacuum=True),
+    Migration(3, "query indexes", create_query_indexes),
+    Migration(4, "per-inbox message cap", add_inbox_message_cap),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def schema_version(connection: Connection) -> int:
+    return connection.execute(text("PRAGMA user_version")).scalar()
+
+
+@contextmanager
+def _transaction(engine: Engine) -> Generator[Connection]:
+    """
+    An explicit BEGIN/COMMIT around a step and its version bump.
+
+    pysqlite doesn't open a transaction before DDL on its own, so engine.begin() would commit
+    every CREATE/DROP/ALTER immediately and a failing step would leave a half-migrated database.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("BEGIN IMMEDIATE"))
+        try:
+            yield connection
+        except BaseException:
+            connection.execute(text("ROLLBACK"))
+            raise
+        connection.execute(text("COMMIT"))
+
+
+def upgrade(engine: Engine, target: int = LATEST_VERSION) -> list[Migration]:
+    """Apply pending migrations in order, each in its own transaction. Returns the applied ones."""
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version > target:
+            break
+        with _transaction(engine) as connection:
+            # Checked inside the transaction so workers starting together don't apply a step twice
+            if schema_version(connection) >= migration.version:
+                continue
+            migration.upgrade(connection)
+            connection.execute(text(f"PRAGMA user_version = {migration.version:d}"))
+        applied.append(migration)
+
+        if migration.vacuum:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                connection.execute(text("VACUUM"))
+    return applied
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Upgrade database schemas to the latest version.")
+    parser.add_argument("urls", nargs="*", help="database urls, defaults to the configured shards")
+    parser.add_argument("--target", type=int, default=LATEST_VERSION, help="stop after this version")
+    args = parser.parse_args(argv)
+
+    engines = [make_engine(url) for url in args.urls] or ShardEngines
+    for engine in engines:
+        applied = upgrade(engine, args.target)
+        with engine.connect() as connection:
+            version = schema_version(connection)
+        steps = ", ".join(f"{m.version} ({m.description})" for m in applied) or "nothing to apply"
+        print(f"{engine.url}: {steps}, now at version {version}")
+
+
+if __name__ == "__main__":
+    main()
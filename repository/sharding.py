@@ -0,0 +1,132 @@
+import argparse
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from domain.models import Inbox, InboxSummary, Message
+from repository.database import Base, InboxORM, MessageORM, make_engine, shard_url
+from repository.inbox import InboxRepository, SQLAlchemyInboxRepository
+from repository.migrations import upgrade
+
+_fanout_executor = ThreadPoolExecutor(thread_name_prefix="shard-fanout")
+
+T = TypeVar("T")
+
+
+def shard_index(inbox_id: str, shard_count: int) -> int:
+    """Stable across processes, unlike the builtin hash()."""
+    digest = hashlib.blake2b(inbox_id.encode(), digest_size=8).digest()
+    return int.from_bytes(digest) % shard_count
+
+
+class ShardedInboxRepository(InboxRepository):
+    """Routes every inbox, together with its messages, to one of N shard repositories by inbox id."""
+
+    def __init__(self, shards: list[InboxRepository]):
+        if not shards:
+            raise ValueError("At least one shard is required")
+        self.shards = shards
+
+    @classmethod
+    def from_sessions(cls, sessions: list[Session]) -> ShardedInboxRepository:
+        return cls([SQLAlchemyInboxRepository(session) for session in sessions])
+
+    def shard_for(self, inbox_id: str) -> InboxRepository:
+        return self.shards[shard_index(inbox_id, len(self.shards))]
+
+    def save_new(self, inbox: Inbox) -> None:
+        self.shard_for(inbox.id).save_new(inbox)
+
+    def edit_topic(self, inbox: Inbox, topic: str) -> None:
+        self.shard_for(inbox.id).edit_topic(inbox, topic)
+
+    def add_message(self, inbox: Inbox, message: Message) -> None:
+        self.shard_for(inbox.id).add_message(inbox, message)
+
+    def list_all(self) -> list[Inbox]:
+        return self._fan_out(lambda shard: shard.list_all())
+
+    def list_by_signature(self, owner_signature: str) -> list[Inbox]:
+        return self._fan_out(lambda shard: shard.list_by_signature(owner_signature))
+
+    def get_by_id(self, inbox_id: str) -> Inbox | None:
+        return self.shard_for(inbox_id).get_by_id(inbox_id)
+
+    def summarize_by_signature(self, owner_signature: str, latest: int) -> list[InboxSummary]:
+        return self._fan_out(lambda shard: shard.summarize_by_signature(owner_signature, latest))
+
+    def _fan_out(self, query: Callable[[InboxRepository], list[T]]) -> list[T]:
+        """Run the query on every shard concurrently and merge the results in shard order."""
+        if len(self.shards) == 1:
+            return query(self.shards[0])
+        return [item for result in _fanout_executor.map(query, self.shards) for item in result]
+
+
+def _copy_columns(orm: Base, exclude: tuple[str, ...] = ()) -> dict:
+    return {
+        column.key: getattr(orm, column.key)
+        for column in orm.__table__.columns
+        if column.key not in exclude
+    }
+
+
+def rebalance(sessions: list[Session], shard_count: int) -> int:
+    """
+    Move every inbox to the shard it hashes to for `shard_count` shards.
+
+    `sessions` must cover every database that may hold data, old shards included, so shrinking
+    is done by passing more sessions than `shard_count`. The copy is committed before the source
+    row is deleted, so an interrupted run leaves a duplicate rather than losing an inbox; running
+    again finds the copy already on its target shard and only deletes the leftover source.
+    Returns the number of moved inboxes.
+    """
+    if shard_count < 1 or shard_count > len(sessions):
+        raise ValueError(f"Shard count must be between 1 and {len(sessions)}")
+
+    moved = 0
+    for source_index, source in enumerate(sessions):
+        inbox_ids = [row.id for row in source.query(InboxORM.id).all()]
+        for inbox_id in inbox_ids:
+            target_index = shard_index(inbox_id, shard_count)
+            if target_index == source_index:
+                continue
+
+            inbox_orm = source.query(InboxORM).filter_by(id=inbox_id).one()
+            target = sessions[target_index]
+            # Already copied by a run that stopped before deleting the source
+            if target.query(InboxORM.id).filter_by(id=inbox_id).first() is None:
+                target.add(InboxORM(
+                    **_copy_columns(inbox_orm),
+                    replies=[MessageORM(**_copy_columns(m, exclude=("id", "inbox_id"))) for m in inbox_orm.replies],
+                ))
+                target.commit()
+
+            source.delete(inbox_orm)
+            source.commit()
+            moved += 1
+    return moved
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Redistribute inboxes after changing the shard count.")
+    parser.add_argument("--from-shards", type=int, required=True, help="shard count the data was written with")
+    parser.add_argument("--to-shards", type=int, required=True, help="new shard count")
+    args = parser.parse_args(argv)
+
+    sessions = []
+    for index in range(max(args.from_shards, args.to_shards)):
+        shard_engine = make_engine(shard_url(index))
+        upgrade(shard_engine)
+        sessions.append(sessionmaker(bind=shard_engine)())
+    try:
+        moved = rebalance(sessions, args.to_shards)
+    finally:
+        for session in sessions:
+            session.close()
+    print(f"Moved {moved} inboxes to {args.to_shards} shards")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
-from domain.models import User, InboxView, Inbox, Message
+import os
+
+from domain.models import User, InboxView, Inbox, InboxSummary, Message, SignatureCache
 from repository.inbox import InboxRepository
 
+signature_cache = SignatureCache(maxsize=int(os.environ.get("FEEDBACK_SIGNATURE_CACHE_SIZE", "4096")))
+
 
 class InboxNotFoundException(Exception):
     pass
@@ -14,6 +18,10 @@ class CannotAddMessageException(Exception):
     pass
 
 
+class CredentialsRequiredException(Exception):
+    pass
+
+
 
 class FeedbackService:
     def __init__(self, repository: InboxRepository) -> None:
@@ -21,6 +29,8 @@ class FeedbackService:
 
     @staticmethod
     def get_user_from_username_and_secret(username, secret) -> User:
+        if username and secret:
+            return User(username, secret, signature=signature_cache.get(username, secret))
         return User(username, secret)
 
     def read_inbox(self, inbox_id: str, user: User) -> InboxView:
@@ -38,12 +48,25 @@ class FeedbackService:
 
         return [inbox.view_for(user) for inbox in inboxes]
 
-    def create_inbox(self, topic: str, user: User, requires_signature: bool, expires_in_hours: int) -> InboxView:
+    def dashboard(self, user: User, latest: int) -> list[InboxSummary]:
+        if user.is_anonymous():
+            raise CredentialsRequiredException("Dashboard requires credentials")
+        return self.repository.summarize_by_signature(user.signature, latest)
+
+    def create_inbox(
+            self,
+            topic: str,
+            user: User,
+            requires_signature: bool,
+            expires_in_hours: int,
+            max_messages: int | None = None,
+    ) -> InboxView:
         inbox = Inbox.create(
             topic=topic,
             owner_signature=user.signature,
             requires_signature=requires_signature,
-            expires_in_hours=expires_in_hours
+            expires_in_hours=expires_in_hours,
+            max_messages=max_messages,
         )
         self.repository.save_new(inbox)
         return inbox.view_for(user)
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+
+from api.admission import ConcurrencyLimiter, TokenBucketLimiter
+
+
+async def enter(limiter: ConcurrencyLimiter):
+    admission = limiter()
+    await anext(admission)
+    return admission
+
+
+def test_concurrency_limiter_rejects_when_queue_is_full():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_waiting=0, timeout=1)
+        held = await enter(limiter)
+
+        with pytest.raises(HTTPException) as error:
+            await enter(limiter)
+        assert error.value.status_code == 503
+        assert error.value.headers == {"Retry-After": "1"}
+
+        await held.aclose()
+        await (await enter(limiter)).aclose()
+
+    asyncio.run(scenario())
+
+
+def test_concurrency_limiter_waits_for_a_free_slot():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_waiting=1, timeout=5)
+        held = await enter(limiter)
+        asyncio.get_running_loop().call_later(0.05, lambda: asyncio.ensure_future(held.aclose()))
+
+        waiting = await enter(limiter)
+        assert limiter.waiting == 0
+        await waiting.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_concurrency_limiter_times_out():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_waiting=1, timeout=0.01)
+        held = await enter(limiter)
+
+        with pytest.raises(HTTPException) as error:
+            await enter(limiter)
+        assert error.value.status_code == 503
+        assert limiter.waiting == 0
+        await held.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_concurrency_limiter_overload_does_not_block_other_requests():
+    """A queue deeper than the 40 threadpool workers must neither stall admitted writes nor unrelated reads."""
+    limiter = ConcurrencyLimiter(max_concurrent=2, max_waiting=50, timeout=1)
+    app = FastAPI()
+
+    @app.post("/write", dependencies=[Depends(limiter)])
+    def write():
+        time.sleep(0.05)
+
+    @app.get("/read")
+    def read():
+        return {}
+
+    async def timed(client: httpx.AsyncClient, method: str, url: str) -> tuple[int, float]:
+        started = time.perf_counter()
+        response = await client.request(method, url)
+        return response.status_code, time.perf_counter() - started
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            writes = [asyncio.create_task(timed(client, "POST", "/write")) for _ in range(60)]
+            await asyncio.sleep(0.02)
+            read = await timed(client, "GET", "/read")
+            return await asyncio.gather(*writes), read
+
+    writes, (read_status, read_elapsed) = asyncio.run(scenario())
+
+    admitted = sorted(elapsed for status, elapsed in writes if status == 200)
+    rejected = [elapsed for status, elapsed in writes if status == 503]
+    assert len(admitted) + len(rejected) == 60
+    # The first writes get a slot straight away and only pay for their own 0.05 s
+    assert admitted[0] < 0.3
+    # Requests beyond the queue are turned away without waiting for the timeout
+    assert min(rejected) < 0.3
+    assert read_status == 200
+    assert read_elapsed < 0.3
+
+
+def test_token_bucket_allows_burst_then_refills():
+    limiter = TokenBucketLimiter(rate=2, burst=2)
+    assert limiter.acquire("owner#sig", now=0) == 0
+    assert limiter.acquire("owner#sig", now=0) == 0
+    assert limiter.acquire("owner#sig", now=0) == pytest.approx(0.5)
+    assert limiter.acquire("other#sig", now=0) == 0
+    assert limiter.acquire("owner#sig", now=0.5) == 0
+
+
+def test_token_bucket_check_raises_429():
+    limiter = TokenBucketLimiter(rate=0.1, burst=1)
+    limiter.check("127.0.0.1")
+    with pytest.raises(HTTPException) as error:
+        limiter.check("127.0.0.1")
+    assert error.value.status_code == 429
+    assert error.value.headers == {"Retry-After": "10"}
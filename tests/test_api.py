@@ -1,12 +1,14 @@
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from datetime import datetime, timedelta
 from unittest.mock import Mock
 
 from main import app
+from api import admission, schemas
 from api.routes import get_feedback_service
-from domain.models import Inbox, InboxView, User, Message
-from service.feedback_service import InboxNotFoundException
+from domain.models import Inbox, InboxSummary, InboxView, User, Message
+from service.feedback_service import InboxNotFoundException, CredentialsRequiredException
 
 client = TestClient(app)
 
@@ -78,6 +80,18 @@ def test_create_inbox_success(sample_inbox):
     assert response.status_code == 200
     assert response.json()["id"] == "inbox_123"
 
+
+def test_create_inbox_passes_message_cap(sample_inbox):
+    mock_service.create_inbox.return_value = InboxView(inbox=sample_inbox, messages=[])
+    mock_service.get_user_from_username_and_secret.return_value = User("owner", "pass")
+
+    payload = {"topic": "Capped", "username": "owner", "secret": "pass", "max_messages": 100}
+    assert client.post("/inboxes", json=payload).status_code == 200
+    assert mock_service.create_inbox.call_args.kwargs["max_messages"] == 100
+
+    payload["max_messages"] = 0
+    assert client.post("/inboxes", json=payload).status_code == 422
+
 def test_read_inbox_not_found():
     # Setup: Service raises our custom exception
     mock_service.read_inbox.side_effect = InboxNotFoundException()
@@ -88,4 +102,77 @@ def test_read_inbox_not_found():
 
     # Assert
     assert response.status_code == 404
-    assert response.json()["detail"] == "Inbox not found"
\ No newline at end of file
+    assert response.json()["detail"] == "Inbox not found"
+
+def test_list_inboxes_as_owner_matches_schema(sample_inbox):
+    view = InboxView(
+        inbox=sample_inbox,
+        messages=[Message(body="Hello!", timestamp=datetime(2025, 1, 1, 12, 30), signature=None)]
+    )
+    mock_service.list_inboxes.return_value = [view]
+    mock_service.get_user_from_username_and_secret.return_value = User("owner", "pass")
+
+    response = client.get("/inboxes", headers={"x-username": "owner", "x-secret": "pass"})
+
+    assert response.status_code == 200
+    assert response.content == f"[{schemas.InboxOwnerRead.from_domain(view).model_dump_json()}]".encode()
+
+
+def test_list_inboxes_keeps_response_schema():
+    responses = app.openapi()["paths"]["/inboxes"]["get"]["responses"]
+    schema = responses["200"]["content"]["application/json"]["schema"]
+    refs = {variant["items"]["$ref"].rsplit("/", 1)[-1] for variant in schema["anyOf"]}
+    assert refs == {"InboxOwnerRead", "InboxPublicRead"}
+
+
+def test_create_message_rate_limited(monkeypatch):
+    monkeypatch.setattr(admission, "write_rate", admission.TokenBucketLimiter(rate=0.5, burst=1))
+    mock_service.get_user_from_username_and_secret.return_value = User("writer", "secret")
+    mock_service.add_inbox_message.side_effect = None
+    mock_service.add_inbox_message.return_value = Message(body="Hi", timestamp=datetime.now(), signature="w#sig")
+
+    payload = {"body": "Hi", "username": "writer", "secret": "secret"}
+    assert client.post("/inboxes/inbox_123/messages", json=payload).status_code == 200
+
+    response = client.post("/inboxes/inbox_123/messages", json=payload)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+
+
+def test_rate_limit_checked_before_write_slot(monkeypatch):
+    def write_slots_full():
+        raise HTTPException(status_code=503, detail="Server busy")
+
+    monkeypatch.setattr(admission, "write_rate", admission.TokenBucketLimiter(rate=0.5, burst=1))
+    monkeypatch.setitem(app.dependency_overrides, admission.message_writes, write_slots_full)
+    mock_service.get_user_from_username_and_secret.return_value = User("writer", "secret")
+
+    payload = {"body": "Hi", "username": "writer", "secret": "secret"}
+    assert client.post("/inboxes/inbox_123/messages", json=payload).status_code == 503
+    assert client.post("/inboxes/inbox_123/messages", json=payload).status_code == 429
+
+
+def test_read_dashboard(sample_inbox):
+    summary = InboxSummary(
+        inbox=sample_inbox,
+        message_count=42,
+        latest_messages=[Message(body="Latest", timestamp=datetime.now(), signature=None)]
+    )
+    mock_service.dashboard.side_effect = None
+    mock_service.dashboard.return_value = [summary]
+    mock_service.get_user_from_username_and_secret.return_value = User("owner", "pass")
+
+    response = client.get("/dashboard?latest=1", headers={"x-username": "owner", "x-secret": "pass"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data[0]["message_count"] == 42
+    assert [m["body"] for m in data[0]["messages"]] == ["Latest"]
+    assert mock_service.dashboard.call_args.args[1] == 1
+
+
+def test_read_dashboard_anonymous():
+    mock_service.dashboard.side_effect = CredentialsRequiredException()
+    mock_service.get_user_from_username_and_secret.return_value = User(None, None)
+
+    assert client.get("/dashboard").status_code == 401
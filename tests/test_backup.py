@@ -0,0 +1,157 @@
+import gzip
+import json
+import sqlite3
+import threading
+import time
+
+from pytest import fixture
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from domain.models import Inbox, Message
+from repository.backup import export_ndjson, import_ndjson, main, restore, shard_file, snapshot
+from repository.inbox import SQLAlchemyInboxRepository
+from repository.migrations import upgrade
+from repository.sharding import ShardedInboxRepository, shard_index
+
+
+def make_repo(url: str) -> SQLAlchemyInboxRepository:
+    engine = create_engine(url)
+    upgrade(engine)
+    return SQLAlchemyInboxRepository(sessionmaker(bind=engine)())
+
+
+@fixture
+def source_url(tmp_path):
+    return f"sqlite:///{tmp_path}/source.db"
+
+
+@fixture
+def inboxes(source_url):
+    repo = make_repo(source_url)
+    inboxes = [Inbox.create(f"T{i}", "owner#sig", 1, False, max_messages=5 if i else None) for i in range(3)]
+    for inbox in inboxes:
+        repo.save_new(inbox)
+        for body in ("first", "second"):
+            repo.add_message(inbox, Message(body=body, signature="user#sig"))
+    repo.db.close()
+    return inboxes
+
+
+def assert_same_inboxes(url: str, expected: list[Inbox]) -> None:
+    repo = make_repo(url)
+    loaded = {inbox.id: inbox for inbox in repo.list_all()}
+    assert set(loaded) == {inbox.id for inbox in expected}
+    for inbox in expected:
+        copy = loaded[inbox.id]
+        assert (copy.topic, copy.expires_at, copy.max_messages) == (inbox.topic, inbox.expires_at, inbox.max_messages)
+        assert [m.body for m in copy.messages] == ["first", "second"]
+    repo.db.close()
+
+
+def test_snapshot_and_restore(tmp_path, source_url, inboxes):
+    steps = []
+    snapshot(source_url, f"{tmp_path}/snapshot.db", pages=1, report=lambda done, total: steps.append(done))
+    assert len(steps) > 1
+    assert_same_inboxes(f"sqlite:///{tmp_path}/snapshot.db", inboxes)
+
+    target_url = f"sqlite:///{tmp_path}/restored.db"
+    restore(f"{tmp_path}/snapshot.db", target_url)
+    assert_same_inboxes(target_url, inboxes)
+
+
+def test_snapshot_finishes_under_concurrent_writes(tmp_path, source_url, inboxes):
+    repo = make_repo(source_url)
+    for _ in range(200):
+        repo.add_message(inboxes[0], Message(body="x" * 500))
+    repo.db.close()
+
+    stop = threading.Event()
+
+    def write_continuously():
+        connection = sqlite3.connect(f"{tmp_path}/source.db")
+        while not stop.is_set():
+            connection.execute("INSERT INTO messages (inbox_id, body) SELECT id, 'more' FROM inboxes LIMIT 1")
+            connection.commit()
+            time.sleep(0.001)
+        connection.close()
+
+    done = []
+    writer = threading.Thread(target=write_continuously)
+    copier = threading.Thread(
+        target=snapshot,
+        args=(source_url, f"{tmp_path}/snapshot.db"),
+        kwargs={"pages": 1, "report": lambda copied, total: done.append(copied)},
+        daemon=True,
+    )
+    writer.start()
+    try:
+        copier.start()
+        copier.join(timeout=30)
+    finally:
+        stop.set()
+        writer.join()
+
+    assert not copier.is_alive()
+    # The writer kept sending the paged copy back to the start, yet it completed
+    assert any(later <= earlier for earlier, later in zip(done, done[1:]))
+    with sqlite3.connect(f"{tmp_path}/snapshot.db") as copy:
+        assert copy.execute("PRAGMA integrity_check").fetchone() == ("ok",)
+        assert copy.execute("SELECT count(*) FROM messages").fetchone()[0] > 206
+
+
+def test_export_import_roundtrip(tmp_path, source_url, inboxes):
+    path = f"{tmp_path}/export.ndjson.gz"
+    assert export_ndjson([create_engine(source_url)], path) == 3 + 6
+
+    with gzip.open(path, "rt") as export:
+        tables = [json.loads(line)["table"] for line in export]
+    assert tables == ["inboxes"] * 3 + ["messages"] * 6
+
+    target_url = f"sqlite:///{tmp_path}/imported.db"
+    assert import_ndjson([create_engine(target_url)], path) == 9
+    assert_same_inboxes(target_url, inboxes)
+
+
+def make_sharded_repo(urls: list[str]) -> ShardedInboxRepository:
+    return ShardedInboxRepository([make_repo(url) for url in urls])
+
+
+def test_export_import_roundtrip_across_shards(tmp_path):
+    source_urls = [f"sqlite:///{tmp_path}/source{i}.db" for i in range(2)]
+    source = make_sharded_repo(source_urls)
+    inboxes = [Inbox.create(f"T{i}", "owner#sig", 1, False) for i in range(20)]
+    for inbox in inboxes:
+        source.save_new(inbox)
+        for body in ("first", "second"):
+            source.add_message(inbox, Message(body=body))
+    assert all(shard.list_all() for shard in source.shards)
+
+    path = f"{tmp_path}/export.ndjson.gz"
+    assert export_ndjson([create_engine(url) for url in source_urls], path) == 20 + 40
+
+    target_urls = [f"sqlite:///{tmp_path}/target{i}.db" for i in range(2)]
+    assert import_ndjson([create_engine(url) for url in target_urls], path) == 60
+
+    target = make_sharded_repo(target_urls)
+    for index, shard in enumerate(target.shards):
+        assert all(shard_index(inbox.id, 2) == index for inbox in shard.list_all())
+    for inbox in inboxes:
+        assert [m.body for m in target.get_by_id(inbox.id).messages] == ["first", "second"]
+
+
+def test_cli_snapshots_and_restores_every_shard(tmp_path):
+    urls = [f"sqlite:///{tmp_path}/feedback.db", f"sqlite:///{tmp_path}/feedback.shard1.db"]
+    inboxes = [Inbox.create(f"T{i}", "owner#sig", 1, False) for i in range(6)]
+    repo = make_sharded_repo(urls)
+    for inbox in inboxes:
+        repo.save_new(inbox)
+    url_args = [argument for url in urls for argument in ("--url", url)]
+
+    main([*url_args, "snapshot", f"{tmp_path}/snapshot.db"])
+    assert shard_file(f"{tmp_path}/snapshot.db", 1) == f"{tmp_path}/snapshot.shard1.db"
+
+    restored_urls = [f"sqlite:///{tmp_path}/restored.db", f"sqlite:///{tmp_path}/restored.shard1.db"]
+    main([*[argument for url in restored_urls for argument in ("--url", url)], "restore", f"{tmp_path}/snapshot.db"])
+    restored = make_sharded_repo(restored_urls)
+    assert {inbox.id for inbox in restored.list_all()} == {inbox.id for inbox in inboxes}
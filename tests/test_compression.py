@@ -0,0 +1,73 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.compression import CompressionMiddleware, negotiate_encoding
+
+inner_app = FastAPI()
+
+
+@inner_app.get("/big")
+def big():
+    return [{"owner_signature": "owner#0123456789", "topic": "Repeated"}] * 200
+
+
+@inner_app.get("/small")
+def small():
+    return {"status": "ok"}
+
+
+@pytest.fixture
+def middleware():
+    return CompressionMiddleware(inner_app, minimum_size=500, gzip_level=5, brotli_quality=4)
+
+
+@pytest.fixture
+def client(middleware):
+    return TestClient(middleware)
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("identity") is None
+
+
+def test_negotiate_encoding_prefers_brotli():
+    assert negotiate_encoding("gzip, deflate, br") == "br"
+    assert negotiate_encoding("*") == "br"
+    assert negotiate_encoding("gzip;q=1.0, br;q=0.5") == "gzip"
+
+
+def test_large_response_is_gzipped(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json()[0]["topic"] == "Repeated"
+
+
+def test_large_response_is_brotli_compressed(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json()[0]["topic"] == "Repeated"
+
+
+def test_small_response_is_not_compressed(client):
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_public_responses_are_compressed_once(client, middleware, monkeypatch):
+    calls = []
+    compress = middleware.compress
+    monkeypatch.setattr(middleware, "compress", lambda body, encoding: calls.append(body) or compress(body, encoding))
+
+    for _ in range(3):
+        assert client.get("/big", headers={"Accept-Encoding": "gzip"}).status_code == 200
+    assert len(calls) == 1
+
+    client.get("/big", headers={"Accept-Encoding": "gzip", "x-username": "owner", "x-secret": "s"})
+    assert len(calls) == 2
+    assert len(middleware.cache) == 1
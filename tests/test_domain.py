@@ -1,6 +1,6 @@
 from pytest import fixture, raises
 from datetime import datetime, timedelta
-from domain.models import Inbox, Message, generate_tripcode_signature, User
+from domain.models import Inbox, Message, generate_tripcode_signature, User, SignatureCache
 
 
 @fixture
@@ -83,6 +83,41 @@ def test_tripcode_separator():
     assert len(b) == 2
 
 
+def test_signature_cache_matches_tripcode():
+    cache = SignatureCache()
+    assert cache.get("u", "s") == generate_tripcode_signature("u", "s")
+    assert cache.get("u", "s") == generate_tripcode_signature("u", "s")
+    assert (cache.hits, cache.misses, cache.hit_rate) == (1, 1, 0.5)
+
+
+def test_signature_cache_evicts_least_recently_used():
+    cache = SignatureCache(maxsize=2)
+    cache.get("a", "s")
+    cache.get("b", "s")
+    cache.get("a", "s")
+    cache.get("c", "s")
+    assert len(cache) == 2
+
+    cache.get("a", "s")
+    assert cache.hits == 2
+    cache.get("b", "s")
+    assert cache.misses == 4
+
+
+def test_signature_cache_does_not_keep_secrets():
+    cache = SignatureCache()
+    cache.get("u", "very-secret")
+    assert all(isinstance(key, bytes) and len(key) == 32 for key in cache._signatures)
+    assert not any("very-secret" in signature for signature in cache._signatures.values())
+
+
+def test_signature_cache_keeps_credential_splits_apart():
+    cache = SignatureCache()
+    assert cache.get("ab", "c") == generate_tripcode_signature("ab", "c")
+    assert cache.get("a", "bc") == generate_tripcode_signature("a", "bc")
+    assert (len(cache), cache.misses) == (2, 2)
+
+
 """Message tests"""
 def test_message_create_signature_from_user():
     user = User("u", "s")
@@ -123,6 +158,19 @@ def test_inbox_add_message_success(active_inbox_anonymous: Inbox, message: Messa
     assert active_inbox_anonymous.messages[0].body == message.body
 
 
+def test_inbox_add_message_drops_oldest_over_cap(owner_signature: str, now: datetime):
+    inbox = Inbox.create("t", owner_signature, 2, False, now=now, max_messages=2)
+    for body in ("first", "second", "third"):
+        inbox.add_message(Message(body=body, timestamp=now))
+
+    assert [m.body for m in inbox.messages] == ["second", "third"]
+
+
+def test_inbox_create_rejects_empty_cap(owner_signature: str):
+    with raises(ValueError, match="at least one message"):
+        Inbox.create("t", owner_signature, 2, False, max_messages=0)
+
+
 def test_inbox_add_message_fails_when_expired(active_inbox_anonymous: Inbox, now: datetime, message: Message):
     active_inbox_anonymous.expires_at = now - timedelta(hours=1)
 
@@ -0,0 +1,176 @@
+from datetime import datetime
+
+from pytest import fixture, raises
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from domain.models import Inbox, Message
+from repository.database import Base
+from repository.inbox import SQLAlchemyInboxRepository
+from repository.migrations import LATEST_VERSION, MIGRATIONS, Migration, inbox_ids_are_blobs, schema_version, \
+    upgrade
+
+LEGACY_ID = "0b5e3c2a-8f3d-4c1e-9a57-3d2f1e6b7c10"
+
+
+@fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path}/feedback.db")
+
+
+@fixture
+def legacy_engine(engine):
+    """A database from before versioning, with string inbox ids."""
+    upgrade(engine, target=1)
+    with engine.begin() as connection:
+        connection.execute(text("PRAGMA user_version = 0"))
+        connection.execute(text(
+            "INSERT INTO inboxes VALUES (:id, 'Legacy topic', 'owner#sig', '2030-01-01 12:00:00.000000', 1)"
+        ), {"id": LEGACY_ID})
+        connection.execute(text(
+            "INSERT INTO messages VALUES (1, :id, 'old reply', '2029-12-31 08:30:00.000000', 'user#sig')"
+        ), {"id": LEGACY_ID})
+    return engine
+
+
+@fixture
+def repo(engine):
+    upgrade(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield SQLAlchemyInboxRepository(session)
+    finally:
+        session.close()
+
+
+def schema_of(engine) -> dict:
+    inspector = inspect(engine)
+    return {
+        table: (
+            [(column["name"], str(column["type"])) for column in inspector.get_columns(table)],
+            sorted((index["name"], tuple(index["column_names"])) for index in inspector.get_indexes(table)),
+        )
+        for table in inspector.get_table_names()
+    }
+
+
+def test_upgrade_fresh_database_matches_models(engine, tmp_path):
+    applied = upgrade(engine)
+
+    assert [m.version for m in applied] == [m.version for m in MIGRATIONS]
+    with engine.connect() as connection:
+        assert schema_version(connection) == LATEST_VERSION
+
+    models_engine = create_engine(f"sqlite:///{tmp_path}/models.db")
+    Base.metadata.create_all(bind=models_engine)
+    assert schema_of(engine) == schema_of(models_engine)
+
+
+def test_upgrade_legacy_database(legacy_engine):
+    upgrade(legacy_engine)
+
+    with legacy_engine.connect() as connection:
+        assert inbox_ids_are_blobs(connection)
+        assert connection.execute(text("SELECT length(inbox_id) FROM messages")).scalar() == 16
+
+    session = sessionmaker(bind=legacy_engine)()
+    inbox = SQLAlchemyInboxRepository(session).get_by_id(LEGACY_ID)
+    assert inbox.topic == "Legacy topic"
+    assert inbox.expires_at == datetime(2030, 1, 1, 12, 0)
+    assert [(m.body, m.signature) for m in inbox.messages] == [("old reply", "user#sig")]
+    session.close()
+
+
+def test_upgrade_unversioned_database_from_models(engine, tmp_path):
+    """Databases made by create_all before versioning already have some of the changes."""
+    Base.metadata.create_all(bind=engine)
+    upgrade(engine)
+    with engine.connect() as connection:
+        assert schema_version(connection) == LATEST_VERSION
+
+    models_engine = create_engine(f"sqlite:///{tmp_path}/models.db")
+    Base.metadata.create_all(bind=models_engine)
+    assert schema_of(engine) == schema_of(models_engine)
+
+
+def test_upgrade_is_idempotent(engine):
+    upgrade(engine)
+    assert upgrade(engine) == []
+
+
+def test_failed_step_is_rolled_back(engine, monkeypatch):
+    def broken(connection):
+        connection.execute(text("CREATE TABLE half_done (id INTEGER)"))
+        raise RuntimeError("step failed")
+
+    broken_migration = Migration(LATEST_VERSION + 1, "broken", broken)
+    monkeypatch.setattr("repository.migrations.MIGRATIONS", [*MIGRATIONS, broken_migration])
+    with raises(RuntimeError):
+        upgrade(engine, target=LATEST_VERSION + 1)
+
+    with engine.connect() as connection:
+        assert schema_version(connection) == LATEST_VERSION
+    assert "half_done" not in inspect(engine).get_table_names()
+
+
+def query_plans(repo: SQLAlchemyInboxRepository, call) -> list[str]:
+    """EXPLAIN QUERY PLAN of every SELECT the repository runs during call()."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    db_engine = repo.db.get_bind()
+    event.listen(db_engine, "before_cursor_execute", capture)
+    try:
+        call()
+    finally:
+        event.remove(db_engine, "before_cursor_execute", capture)
+
+    plans = []
+    for statement, parameters in statements:
+        rows = repo.db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        plans.append(" | ".join(row[-1] for row in rows))
+    return plans
+
+
+def test_list_by_signature_uses_indexes(repo):
+    inbox = Inbox.create("T", "owner#1", 1, False)
+    repo.save_new(inbox)
+    repo.add_message(inbox, Message(body="hi"))
+
+    inbox_plan, message_plan = query_plans(repo, lambda: repo.list_by_signature("owner#1"))
+    assert "USING INDEX ix_inboxes_owner_signature" in inbox_plan
+    assert "USING INDEX ix_messages_inbox_id" in message_plan
+
+
+def test_get_by_id_uses_indexes(repo):
+    inbox = Inbox.create("T", "owner#1", 1, False)
+    repo.save_new(inbox)
+
+    inbox_plan, message_plan = query_plans(repo, lambda: repo.get_by_id(inbox.id))
+    assert "sqlite_autoindex_inboxes_1" in inbox_plan
+    assert "USING INDEX ix_messages_inbox_id" in message_plan
+
+
+def test_expiry_lookup_uses_index(repo):
+    rows = repo.db.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN SELECT id FROM inboxes WHERE expires_at < ?", (datetime.now().isoformat(),)
+    ).all()
+    assert "USING INDEX ix_inboxes_expires_at" in rows[0][-1]
+
+
+def test_summarize_by_signature_reads_only_latest_replies(repo):
+    inbox = Inbox.create("T", "owner#1", 1, False)
+    repo.save_new(inbox)
+    for body in ("one", "two", "three"):
+        repo.add_message(inbox, Message(body=body))
+
+    (plan,) = query_plans(repo, lambda: repo.summarize_by_signature("owner#1", latest=2))
+    assert "USING INDEX ix_inboxes_owner_signature" in plan
+    # Count and newest ids come from the index alone; no pass over every reply
+    assert plan.count("USING COVERING INDEX ix_messages_inbox_id") == 2
+    assert "SCAN messages" not in plan
+    # The one sort left orders the returned rows, at most `latest` per inbox
+    assert plan.count("USE TEMP B-TREE") == 1
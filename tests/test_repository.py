@@ -80,3 +80,55 @@ def test_list_by_owner(repo):
 
 def test_get_non_existent_inbox(repo):
     assert repo.get_by_id("does-not-exist") is None
+
+
+def test_get_by_id_rejects_non_canonical_ids(repo, sample_inbox):
+    repo.save_new(sample_inbox)
+    for spelling in (sample_inbox.id.upper(), f"{{{sample_inbox.id}}}", sample_inbox.id.replace("-", "")):
+        assert repo.get_by_id(spelling) is None
+
+
+def test_messages_are_loaded_per_inbox(repo):
+    inbox1 = Inbox.create("T1", "owner#1", 1, False)
+    inbox2 = Inbox.create("T2", "owner#1", 1, False)
+    repo.save_new(inbox1)
+    repo.save_new(inbox2)
+    repo.add_message(inbox1, Message(body="first"))
+    repo.add_message(inbox2, Message(body="other"))
+    repo.add_message(inbox1, Message(body="second"))
+
+    results = {inbox.id: [m.body for m in inbox.messages] for inbox in repo.list_by_signature("owner#1")}
+    assert results == {inbox1.id: ["first", "second"], inbox2.id: ["other"]}
+
+
+def test_add_message_drops_oldest_over_cap(repo):
+    inbox = Inbox.create("T", "owner#1", 1, False, max_messages=2)
+    repo.save_new(inbox)
+    for body in ("first", "second", "third"):
+        message = Message(body=body)
+        inbox.add_message(message)
+        repo.add_message(inbox, message)
+
+    fetched = repo.get_by_id(inbox.id)
+    assert fetched.max_messages == 2
+    assert [m.body for m in fetched.messages] == ["second", "third"]
+
+
+def test_summarize_by_signature_keeps_latest_messages(repo):
+    busy = Inbox.create("Busy", "owner#1", 1, False)
+    quiet = Inbox.create("Quiet", "owner#1", 1, False)
+    other = Inbox.create("Other", "owner#2", 1, False)
+    for inbox in (busy, quiet, other):
+        repo.save_new(inbox)
+    for body in ("one", "two", "three", "four"):
+        repo.add_message(busy, Message(body=body))
+    repo.add_message(other, Message(body="not mine"))
+
+    summaries = {s.inbox.id: s for s in repo.summarize_by_signature("owner#1", latest=2)}
+    assert set(summaries) == {busy.id, quiet.id}
+    assert summaries[busy.id].message_count == 4
+    assert [m.body for m in summaries[busy.id].latest_messages] == ["three", "four"]
+    assert (summaries[quiet.id].message_count, summaries[quiet.id].latest_messages) == (0, [])
+
+    counts_only = repo.summarize_by_signature("owner#1", latest=0)
+    assert sorted((s.message_count, len(s.latest_messages)) for s in counts_only) == [(0, 0), (4, 0)]
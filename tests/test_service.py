@@ -1,7 +1,8 @@
 from unittest.mock import Mock
 import pytest
-from domain.models import User, Inbox
-from service.feedback_service import FeedbackService, InboxNotFoundException
+from domain.models import User, Inbox, generate_tripcode_signature
+from service.feedback_service import FeedbackService, InboxNotFoundException, CredentialsRequiredException, \
+    signature_cache
 
 
 # 1. Setup Fixture
@@ -35,4 +36,24 @@ def test_read_missing_inbox_raises_error(service, mock_repo):
 
     # Assert
     with pytest.raises(InboxNotFoundException):
-        service.read_inbox("missing_id", user)
\ No newline at end of file
+        service.read_inbox("missing_id", user)
+
+
+def test_get_user_signature_is_cached():
+    signature_cache.clear()
+    first = FeedbackService.get_user_from_username_and_secret("test", "secret")
+    second = FeedbackService.get_user_from_username_and_secret("test", "secret")
+
+    assert first.signature == second.signature == generate_tripcode_signature("test", "secret")
+    assert signature_cache.hits == 1
+    assert FeedbackService.get_user_from_username_and_secret(None, None).is_anonymous()
+
+
+def test_dashboard_requires_credentials(service, mock_repo):
+    with pytest.raises(CredentialsRequiredException):
+        service.dashboard(User(None, None), latest=5)
+    mock_repo.summarize_by_signature.assert_not_called()
+
+    owner = User("test", "secret")
+    service.dashboard(owner, latest=5)
+    mock_repo.summarize_by_signature.assert_called_once_with(owner.signature, 5)
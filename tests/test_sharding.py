@@ -0,0 +1,125 @@
+from pytest import fixture, raises
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from repository.database import Base, InboxORM
+from repository.sharding import ShardedInboxRepository, rebalance, shard_index
+from domain.models import Inbox, Message
+
+
+@fixture
+def shard_sessions(tmp_path):
+    """Three file-backed shards; in-memory SQLite would give every fan-out thread its own empty database."""
+    sessions = []
+    for index in range(3):
+        engine = create_engine(f"sqlite:///{tmp_path}/shard{index}.db", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        sessions.append(sessionmaker(bind=engine)())
+    try:
+        yield sessions
+    finally:
+        for session in sessions:
+            session.close()
+
+
+@fixture
+def repo(shard_sessions):
+    return ShardedInboxRepository.from_sessions(shard_sessions)
+
+
+def make_inboxes(count: int, owner_signature: str = "owner#sig") -> list[Inbox]:
+    return [Inbox.create(f"T{i}", owner_signature, 1, False) for i in range(count)]
+
+
+def test_shard_index_is_stable():
+    assert shard_index("inbox", 4) == shard_index("inbox", 4)
+    assert 0 <= shard_index("inbox", 4) < 4
+
+
+def test_inbox_and_messages_live_on_one_shard(repo, shard_sessions):
+    inbox = make_inboxes(1)[0]
+    repo.save_new(inbox)
+    repo.add_message(inbox, Message(body="hi"))
+
+    expected = shard_index(inbox.id, len(shard_sessions))
+    for index, session in enumerate(shard_sessions):
+        stored = session.query(InboxORM).filter_by(id=inbox.id).first()
+        assert (stored is not None) == (index == expected)
+
+    fetched = repo.get_by_id(inbox.id)
+    assert [m.body for m in fetched.messages] == ["hi"]
+
+
+def test_non_canonical_id_is_not_found_on_any_shard(repo):
+    inboxes = make_inboxes(6)
+    for inbox in inboxes:
+        repo.save_new(inbox)
+
+    # Other spellings would hash to arbitrary shards, so they are never found, not just sometimes
+    assert all(repo.get_by_id(inbox.id.upper()) is None for inbox in inboxes)
+    assert all(repo.get_by_id(inbox.id) is not None for inbox in inboxes)
+
+
+def test_list_fans_out_across_shards(repo):
+    mine = make_inboxes(10)
+    others = make_inboxes(5, owner_signature="other#sig")
+    for inbox in mine + others:
+        repo.save_new(inbox)
+
+    assert {i.id for i in repo.list_all()} == {i.id for i in mine + others}
+    assert {i.id for i in repo.list_by_signature("owner#sig")} == {i.id for i in mine}
+
+
+def test_summaries_fan_out_across_shards(repo):
+    inboxes = make_inboxes(6)
+    for inbox in inboxes:
+        repo.save_new(inbox)
+        repo.add_message(inbox, Message(body="hi"))
+
+    summaries = repo.summarize_by_signature("owner#sig", latest=1)
+    assert {s.inbox.id for s in summaries} == {i.id for i in inboxes}
+    assert all(s.message_count == 1 for s in summaries)
+
+
+def test_rebalance_grows_shard_count(shard_sessions):
+    small = ShardedInboxRepository.from_sessions(shard_sessions[:1])
+    inboxes = make_inboxes(12)
+    for inbox in inboxes:
+        small.save_new(inbox)
+    small.add_message(inboxes[0], Message(body="kept"))
+
+    moved = rebalance(shard_sessions, 3)
+
+    assert moved == sum(1 for i in inboxes if shard_index(i.id, 3) != 0)
+    large = ShardedInboxRepository.from_sessions(shard_sessions)
+    assert {i.id for i in large.list_all()} == {i.id for i in inboxes}
+    assert [m.body for m in large.get_by_id(inboxes[0].id).messages] == ["kept"]
+
+
+def test_rebalance_recovers_from_interrupted_move(shard_sessions, monkeypatch):
+    small = ShardedInboxRepository.from_sessions(shard_sessions[:1])
+    inboxes = make_inboxes(12)
+    for inbox in inboxes:
+        small.save_new(inbox)
+        small.add_message(inbox, Message(body="kept"))
+
+    def interrupted(orm):
+        raise KeyboardInterrupt
+
+    # Stop after the first copy is committed on its target, before the source row is deleted
+    monkeypatch.setattr(shard_sessions[0], "delete", interrupted)
+    with raises(KeyboardInterrupt):
+        rebalance(shard_sessions, 3)
+    monkeypatch.undo()
+    shard_sessions[0].rollback()
+
+    rebalance(shard_sessions, 3)
+
+    stored = [row.id for session in shard_sessions for row in session.query(InboxORM.id).all()]
+    assert sorted(stored) == sorted(inbox.id for inbox in inboxes)
+    large = ShardedInboxRepository.from_sessions(shard_sessions)
+    assert all([m.body for m in large.get_by_id(inbox.id).messages] == ["kept"] for inbox in inboxes)
+
+
+def test_rebalance_rejects_missing_shards(shard_sessions):
+    with raises(ValueError):
+        rebalance(shard_sessions, 4)